@@ -17,8 +17,8 @@ import player as Player
 import threading as Threading
 import statistics
 
-# Global instances
-Display = Graphics.Display("Fox and Sheeps!", '#ccb684')
+# Global instances, the display is made when the application starts
+Display = None
 Board = Entities.Board()
 Gameplay = None
 GameplayThread = None
@@ -91,6 +91,11 @@ def Start():
         sheepsController.depth = 1
     #endregion
 
+    # The agents keep their trees only while they are going to be drawn
+    for controller in (foxController, sheepsController):
+        if(type(controller) == Bot.Agent):
+            controller.needsTree = NeedsTree
+
     # Other options of the board
     maxMoves = Display.GetMaxMoves()
     if(maxMoves == None):
@@ -128,6 +133,11 @@ def GameplayStarts():
     Profiler.Start()
     pass
 
+# GAME PLAY THREAD
+def NeedsTree():
+    """ If the agents have to keep their search trees, they are only used for drawing them """
+    return Display.drawTreeCheckVar.get() == 1
+
 # GAME PLAY THREAD
 def ActionUpdate(topNode, controller):
     """ Each time any action is being taken, here we call the update """
@@ -137,8 +147,10 @@ def ActionUpdate(topNode, controller):
         controllerTitle +=  " " + str(controller.depth)
         if(controller.strategy == Entities.Strategy.Deepimax):
             controllerTitle += " (" + str(controller.doa) + "," + str(controller.roa) + ")"
+        print (controller.SearchReport())
 
-    if(Display.drawTreeCheckVar.get() == 1):
+    # The tree is None when the search ran without one, the box was checked in the middle of it
+    if(Display.drawTreeCheckVar.get() == 1 and topNode != None):
         Statistics.DrawTree(topNode, controllerTitle)
 
     if(Display.compareVar.get() == 1):
@@ -183,11 +195,14 @@ def Reset():
 # Application Starts here
 #========================
 
-Initialization()
+# Only when this file is run: the worker processes of the searches import it again where they are not forked
+if __name__ == '__main__':
+    Display = Graphics.Display("Fox and Sheeps!", '#ccb684')
+    Initialization()
 
-# Linking graphics inputs
-Display.SetStartHandler(func = Start)
-Display.SetResetHandler(func = Reset)
+    # Linking graphics inputs
+    Display.SetStartHandler(func = Start)
+    Display.SetResetHandler(func = Reset)
 
-# Main loop
-Display.mainFrame.mainloop()
\ No newline at end of file
+    # Main loop
+    Display.mainFrame.mainloop()
\ No newline at end of file
@@ -0,0 +1,405 @@
+"""
+Benchmarks of the search, numbers that are quoted in the README come from here.
+Each benchmark runs on the starting board unless it says otherwise, and prints its results.
+
+Run it with: python benchmark.py
+
+Written by Ali Zandian (alizandian@outlook.com) for University project, researching a better way to gauge unlimited trees.
+A project at the university of Ashrafi Esfahani.
+"""
+
+import entities as Entities
+import bot as Bot
+import vectorized as Vectorized
+import parallel as Parallel
+import tracemalloc
+import random
+import math
+import time
+import gc
+import os
+
+def CountNodes(top):
+    """ Number of nodes in the tree under the top node (the top included) """
+    count = 0
+    nodes = [top]
+    while(len(nodes) != 0):
+        node = nodes.pop()
+        count += 1
+        nodes.extend(node.GetChildren())
+    return count
+
+def NodeMemory(depths = (3, 4, 5), strategy = Entities.Strategy.Minimax):
+    """
+    Bytes the tree of the strategy takes per node, for each depth.
+    The search runs once before it is measured, so the evaluation cache is already warm
+    and only the tree itself is left in the measured memory.
+    """
+    print ("{0} tree memory".format(strategy.name))
+    for depth in depths:
+        agent = Bot.Agent(strategy)
+        agent.depth = depth
+        agent.doa = 2
+        agent.roa = 3
+        agent.Action(Entities.Board(), Entities.Turn.Fox)
+        gc.collect()
+        tracemalloc.start()
+        result = agent.Action(Entities.Board(), Entities.Turn.Fox)
+        current, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        count = CountNodes(result[1])
+        print ("depth {0}: {1} nodes, {2} bytes per node, {3} bytes at peak".format(depth, count, round(current / count, 1), peak))
+
+def TreeFreeMemory():
+    """ Peak memory and time of each strategy's search with its tree and without it (Agent.needsTree) """
+    print ("Searches with and without a tree")
+    for strategy, depth in ((Entities.Strategy.Minimax, 6), (Entities.Strategy.MinimaxPAB, 6),
+                            (Entities.Strategy.Expectimax, 4), (Entities.Strategy.Deepimax, 8)):
+        for keepTree in (True, False):
+            agent = Bot.Agent(strategy)
+            agent.depth = depth
+            agent.doa = 2
+            agent.roa = 3
+            agent.needsTree = lambda: keepTree
+            agent.Action(Entities.Board(), Entities.Turn.Fox)
+            # A new table, so the measured search does not start from the one before
+            agent.transpositionTable = None
+            gc.collect()
+            tracemalloc.start()
+            start = time.perf_counter()
+            agent.Action(Entities.Board(), Entities.Turn.Fox)
+            elapsed = time.perf_counter() - start
+            current, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            print ("{0} depth {1}, {2}: {3} bytes at peak, {4}s".format(
+                strategy.name, depth, "with tree" if keepTree else "without tree", peak, round(elapsed, 2)))
+
+def MinimaxBudget(budgets = (1000, 30000, 400000), depth = 7):
+    """
+    Checks Minimax without a tree (Draw Tree off) stops at the same depth as with one for each node budget,
+    and takes the same action. The tree is only held to the node budget here.
+    """
+    print ("Minimax node budget with and without a tree")
+    for budget in budgets:
+        results = []
+        for keepTree in (True, False):
+            agent = Bot.Agent(Entities.Strategy.Minimax)
+            agent.depth = depth
+            agent.nodeBudget = budget
+            agent.memoryBudget = None
+            agent.needsTree = lambda: keepTree
+            start = time.perf_counter()
+            result = agent.Action(Entities.Board(), Entities.Turn.Fox)
+            elapsed = time.perf_counter() - start
+            results.append((result[0], agent.depthReached, agent.budgetHit, round(elapsed, 2)))
+        same = results[0][:3] == results[1][:3]
+        print ("{0} nodes: depth {1} with a tree in {2}s, depth {3} without one in {4}s, {5}".format(
+            budget, results[0][1], results[0][3], results[1][1], results[1][3], "same action" if same else "MISMATCH"))
+
+def TimeControl(limits = (0.5, 2, 5)):
+    """ Depth reached and time taken by each strategy's search with the given turn times, from the starting board """
+    print ("Searches with a turn time")
+    for strategy, depth in ((Entities.Strategy.MinimaxPAB, 12), (Entities.Strategy.Expectimax, 10), (Entities.Strategy.Deepimax, 20)):
+        for limit in limits:
+            agent = Bot.Agent(strategy)
+            agent.depth = depth
+            agent.doa = 2
+            agent.roa = 3
+            agent.timeLimit = limit
+            start = time.perf_counter()
+            agent.Action(Entities.Board(), Entities.Turn.Fox)
+            elapsed = time.perf_counter() - start
+            print ("{0}, {1}s turn: depth {2} of {3} in {4}s".format(strategy.name, limit, agent.depthReached, depth, round(elapsed, 2)))
+
+def GamePositions(moves = 20, depth = 4):
+    """ Snapshots and turns of the positions of a game of MinimaxPAB against itself, from the starting board """
+    positions = []
+    board = Entities.Board()
+    turn = Entities.Turn.Fox
+    agent = Bot.Agent(Entities.Strategy.MinimaxPAB)
+    agent.depth = depth
+    for _ in range(moves):
+        positions.append((board.Snapshot(), turn))
+        result = agent.Action(board, turn)
+        if(result == None):
+            break
+        board.Action(result[0][0], result[0][1])
+        turn = Entities.Turn.Sheeps if turn == Entities.Turn.Fox else Entities.Turn.Fox
+    return positions
+
+def GameNodes(positions, strategy, depth, orderActions = True):
+    """
+    Nodes the strategy searches over the game positions at a fixed depth, and the time it takes. An agent plays
+    each side so their tables are kept as in a game. The nodes are the positions looked up in the transposition table,
+    which every searched position is.
+    """
+    agents = {}
+    for turn in (Entities.Turn.Fox, Entities.Turn.Sheeps):
+        agents[turn] = Bot.Agent(strategy)
+        agents[turn].depth = depth
+        agents[turn].orderActions = orderActions
+    board = Entities.Board()
+    nodes = 0
+    start = time.perf_counter()
+    for snapshot, turn in positions:
+        board.Restore(snapshot)
+        agents[turn].Action(board, turn)
+        nodes += agents[turn].transpositionTable.probes
+    return nodes, time.perf_counter() - start
+
+def MoveOrderingNodes(depths = (5, 6, 7)):
+    """ Nodes MinimaxPAB searches over the positions of a game with the actions in the order they are made and ordered """
+    print ("MinimaxPAB nodes with and without move ordering")
+    positions = GamePositions()
+    for depth in depths:
+        for orderActions in (False, True):
+            nodes, elapsed = GameNodes(positions, Entities.Strategy.MinimaxPAB, depth, orderActions)
+            print ("depth {0}, {1}: {2} nodes over {3} positions, {4}s".format(
+                depth, "ordered" if orderActions else "as made", nodes, len(positions), round(elapsed, 2)))
+
+def StarPruningNodes(depths = (3, 4)):
+    """
+    Leaves Expectimax evaluates over the positions of a game without and with cutting the expecting positions,
+    the time it takes and whether the actions were the same.
+    """
+    print ("Expectimax leaves with and without Star1 pruning")
+    positions = GamePositions()
+    board = Entities.Board()
+    cache = Entities.evaluationCache
+    for depth in depths:
+        actions = {}
+        for starPruning in (False, True):
+            agent = Bot.Agent(Entities.Strategy.Expectimax)
+            agent.depth = depth
+            agent.starPruning = starPruning
+            agent.needsTree = lambda: False
+            actions[starPruning] = []
+            leaves = 0
+            start = time.perf_counter()
+            for snapshot, turn in positions:
+                board.Restore(snapshot)
+                evaluations = cache.hits + cache.misses
+                actions[starPruning].append(agent.Action(board, turn))
+                leaves += cache.hits + cache.misses - evaluations
+            print ("depth {0}, {1}: {2} leaves over {3} positions, {4}s".format(
+                depth, "Star1" if starPruning else "full", leaves, len(positions), round(time.perf_counter() - start, 2)))
+        print ("depth {0}: the same actions: {1}".format(depth, actions[False] == actions[True]))
+
+def DeepimaxMemoHits(settings = ((12, 2, 3), (12, 2, 5), (14, 3, 4))):
+    """
+    Time of Deepimax without a tree over the positions of a game, without and with the memo of its re-engagements,
+    and the memo's hits. An agent plays each side so their memos are kept as in a game. Settings are (depth, doa, roa).
+    """
+    print ("Deepimax with and without the re-engagement memo")
+    positions = GamePositions()
+    board = Entities.Board()
+    for depth, doa, roa in settings:
+        for memoMemory in (None, Entities.DeepimaxMemoMemory):
+            agents = {}
+            for turn in (Entities.Turn.Fox, Entities.Turn.Sheeps):
+                agents[turn] = Bot.Agent(Entities.Strategy.Deepimax)
+                agents[turn].depth = depth
+                agents[turn].doa = doa
+                agents[turn].roa = roa
+                agents[turn].memoMemory = memoMemory
+                agents[turn].needsTree = lambda: False
+            hits = 0
+            misses = 0
+            start = time.perf_counter()
+            for snapshot, turn in positions:
+                board.Restore(snapshot)
+                agents[turn].Action(board, turn)
+                if(memoMemory != None):
+                    hits += agents[turn].deepimaxMemo.hits
+                    misses += agents[turn].deepimaxMemo.misses
+            elapsed = time.perf_counter() - start
+            if(memoMemory == None):
+                print ("depth {0}, doa {1}, roa {2}, without the memo: {3}s".format(depth, doa, roa, round(elapsed, 2)))
+            else:
+                print ("depth {0}, doa {1}, roa {2}, with the memo: {3}s, {4} hits of {5} re-engagements".format(
+                    depth, doa, roa, round(elapsed, 2), hits, hits + misses))
+
+def PrincipalVariationNodes(depths = (5, 6, 7)):
+    """ Nodes MinimaxPAB and PVS search over the positions of a game, both with the move ordering """
+    print ("MinimaxPAB and PVS nodes")
+    positions = GamePositions()
+    for depth in depths:
+        for strategy in (Entities.Strategy.MinimaxPAB, Entities.Strategy.PVS):
+            nodes, elapsed = GameNodes(positions, strategy, depth)
+            print ("depth {0}, {1}: {2} nodes over {3} positions, {4}s".format(
+                depth, strategy.name, nodes, len(positions), round(elapsed, 2)))
+
+def QuiescenceStability(depths = (2, 3, 4, 5), plies = 4, reference = 6, count = 30):
+    """
+    How far the points and actions of PVS at the depths are from the ones of a deeper search (the reference depth),
+    with and without the quiescence search, on random positions for both sides.
+    """
+    print ("Quiescence search")
+    positions = []
+    for snapshot in RandomSnapshots(count, 11):
+        for turn in (Entities.Turn.Fox, Entities.Turn.Sheeps):
+            board = Entities.Board()
+            board.Restore(snapshot)
+            board.SetTurn(turn)
+            positions.append(board)
+
+    def Search(board, depth, quiescence):
+        isMax = board.turn == Entities.Turn.Fox
+        return Bot.PrincipalVariationLine(board, 0, depth, isMax, -math.inf, math.inf, Entities.TranspositionTable(), Entities.MoveOrdering(), quiescence)
+
+    references = [Search(board, reference, 0) for board in positions]
+    for depth in depths:
+        for quiescence in (0, plies):
+            start = time.perf_counter()
+            results = [Search(board, depth, quiescence) for board in positions]
+            elapsed = time.perf_counter() - start
+            error = sum(abs(results[i][0] - references[i][0]) for i in range(len(positions))) / len(positions)
+            same = sum(1 for i in range(len(positions)) if results[i][1][:1] == references[i][1][:1])
+            print ("depth {0}, quiescence {1}: {2} points off depth {3} on average, same action in {4} of {5}, {6}s".format(
+                depth, quiescence, round(error, 1), reference, same, len(positions), round(elapsed, 2)))
+
+def ParallelSpeedup(workers = (1, 2, 4)):
+    """
+    Time of each strategy's search from the starting board with its top split over the given numbers of
+    worker processes, 1 is the search in this process. The pools are started before they are timed.
+    """
+    print ("Searches over worker processes, {0} cores".format(os.cpu_count()))
+    for strategy, depth in ((Entities.Strategy.MinimaxPAB, 9), (Entities.Strategy.Expectimax, 5), (Entities.Strategy.Deepimax, 16)):
+        times = {}
+        for count in workers:
+            if(count > 1):
+                Parallel.GetPool(count)
+            agent = Bot.Agent(strategy)
+            agent.depth = depth
+            agent.doa = 2
+            agent.roa = 3
+            agent.workers = count
+            agent.needsTree = lambda: False
+            start = time.perf_counter()
+            agent.Action(Entities.Board(), Entities.Turn.Fox)
+            times[count] = time.perf_counter() - start
+            print ("{0} depth {1}, {2} workers: {3}s, {4} times as fast".format(
+                strategy.name, depth, count, round(times[count], 2), round(times[workers[0]] / times[count], 2)))
+
+def LazySMPSpeedup(workers = (1, 2, 4), depth = 9):
+    """
+    Time of MinimaxPAB with Lazy SMP from the starting board and the positions the main process searched
+    (the probes of the shared table), for the given numbers of processes. The pools are started before they are timed.
+    """
+    print ("Lazy SMP, {0} cores".format(os.cpu_count()))
+    times = {}
+    for count in workers:
+        if(count > 1):
+            Parallel.GetPool(count - 1)
+        agent = Bot.Agent(Entities.Strategy.MinimaxPAB)
+        agent.depth = depth
+        agent.workers = count
+        agent.lazySMP = True
+        agent.needsTree = lambda: False
+        start = time.perf_counter()
+        agent.Action(Entities.Board(), Entities.Turn.Fox)
+        times[count] = time.perf_counter() - start
+        print ("MinimaxPAB depth {0}, {1} processes: {2}s, {3} times as fast, {4} nodes in the main process".format(
+            depth, count, round(times[count], 2), round(times[workers[0]] / times[count], 2), agent.transpositionTable.probes))
+
+def RandomSnapshots(count, seed = 0):
+    """ Snapshots of boards after a random number of random actions from the starting board """
+    generator = random.Random(seed)
+    snapshots = []
+    for _ in range(count):
+        board = Entities.Board()
+        isFox = True
+        for _ in range(generator.randint(0, 60)):
+            actions = board.AvailableActionsFox() if isFox else board.AvailableActionsSheep()
+            if(len(actions) == 0):
+                break
+            action = generator.choice(actions)
+            board.Action(action[0], action[1])
+            isFox = not isFox
+        snapshots.append(board.Snapshot())
+    return snapshots
+
+def BatchEvaluation(count = 20000):
+    """
+    Checks the vectorised evaluation gives the same points as Board.EvaluationFunction
+    on random positions, and times both of them.
+    """
+    print ("Batch evaluation")
+    if(not Vectorized.Available):
+        print ("NumPy is not installed, skipped")
+        return
+    snapshots = RandomSnapshots(count)
+    board = Entities.Board()
+
+    start = time.perf_counter()
+    points = []
+    for snapshot in snapshots:
+        board.Restore(snapshot)
+        points.append(board.EvaluationFunction())
+    scalarTime = time.perf_counter() - start
+
+    start = time.perf_counter()
+    batchPoints = Vectorized.EvaluatePacked(Vectorized.PackSnapshots(snapshots), board.sheepsMax).tolist()
+    batchTime = time.perf_counter() - start
+
+    mismatches = sum(1 for i in range(count) if points[i] != batchPoints[i])
+    print ("{0} positions: {1} mismatches, {2} us per position one by one, {3} us per position in a batch".format(
+        count, mismatches, round(scalarTime / count * 1e6, 2), round(batchTime / count * 1e6, 2)))
+
+def FrontierExpansion(depth = 4):
+    """
+    Children generated per second from the Minimax frontier at the given depth,
+    one position at a time with the board and all at once with the packed arrays.
+    """
+    print ("Frontier expansion")
+    if(not Vectorized.Available):
+        print ("NumPy is not installed, skipped")
+        return
+    board = Entities.Board()
+    frontier = Vectorized.PackSnapshots([board.Snapshot()])
+    isFox = True
+    for _ in range(depth):
+        frontier = Vectorized.ExpandPacked(frontier, isFox)[3]
+        isFox = not isFox
+
+    snapshots = []
+    for foxIndex, sheepMask in frontier.tolist():
+        board.foxIndex = foxIndex
+        board.sheepMask = sheepMask
+        board.HeavyUpdate()
+        snapshots.append(board.Snapshot())
+
+    start = time.perf_counter()
+    generated = 0
+    for snapshot in snapshots:
+        board.Restore(snapshot)
+        actions = board.AvailableActionsFox() if isFox else board.AvailableActionsSheep()
+        for action in actions:
+            captured = board.Action(action[0], action[1])
+            board.Snapshot()
+            board.ReverseAction(action[0], action[1], captured)
+        generated += len(actions)
+    scalarTime = time.perf_counter() - start
+
+    start = time.perf_counter()
+    children = Vectorized.ExpandPacked(frontier, isFox)[3]
+    batchTime = time.perf_counter() - start
+
+    print ("{0} frontier positions, {1} children: {2} positions per second one by one, {3} positions per second packed".format(
+        len(frontier), len(children), int(generated / scalarTime), int(len(children) / batchTime)))
+
+if __name__ == '__main__':
+    NodeMemory()
+    NodeMemory((6, 8), Entities.Strategy.Deepimax)
+    BatchEvaluation()
+    FrontierExpansion()
+    TreeFreeMemory()
+    MinimaxBudget()
+    TimeControl()
+    MoveOrderingNodes()
+    PrincipalVariationNodes()
+    QuiescenceStability()
+    StarPruningNodes()
+    DeepimaxMemoHits()
+    ParallelSpeedup()
+    LazySMPSpeedup()
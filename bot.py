@@ -3,21 +3,35 @@ bot.py. This module contains AI algorithms for taking action by bots.
 They all get the current state of the board and return the calculated action
 based on whom turn it was.
 
-Algorithms are Minimax (with or without alpha-beta pruning), Expectimax and Deepimax.
+Algorithms are Minimax (with or without alpha-beta pruning), principal variation search, Expectimax and Deepimax.
 
 Written by Ali Zandian (alizandian@outlook.com) for University project, researching a better way to gauge unlimited trees.
 A project at the university of Ashrafi Esfahani.
 """
 
 import entities as Entities
+import vectorized as Vectorized
+import parallel as Parallel
 import datetime as Time
-import queue
 import math
 
 # This var is for having a way out of the bot algorithms, 
 # Assigned in GUI by the user.
 algorithmBreak = False
 
+# The time the running search has to be done by, None for no limit. It is set by IterativeDeepening.
+searchDeadline = None
+# A flag shared with another process, the search stops when it is set (in the helpers of a Lazy SMP search)
+searchStop = None
+
+class SearchTimeout(Exception):
+    """ Raised in a search when its deadline has passed, the search is left where it was and thrown away """
+    pass
+
+class BudgetExceeded(SearchTimeout):
+    """ Raised in a search that went over its node budget, it is thrown away as one out of time is """
+    pass
+
 
 class Agent(Entities.Controller):
     """
@@ -31,41 +45,300 @@ class Agent(Entities.Controller):
         self.depth = None
         self.roa = None
         self.doa = None
+        self.transpositionMemory = Entities.TranspositionMemory
+        self.transpositionTable = None
+        # What Deepimax's re-engagements found, kept for the whole game and only used without a tree. None for no memo.
+        self.memoMemory = Entities.DeepimaxMemoMemory
+        self.deepimaxMemo = None
+        # Killer and history ordering of the alpha beta search, kept for the whole game like the table.
+        # Without it the actions are searched in the order they are made, with only the table's action first.
+        self.orderActions = True
+        self.moveOrdering = None
+        # Expectimax cuts the expecting positions that can not get over what the position above them has (Star1),
+        # from the bounds of the evaluation. It takes the same action either way.
+        self.starPruning = True
+        # Plies the alpha beta searches (MinimaxPAB and PVS) go on past their depth with captures only, 0 for none
+        self.quiescence = 0
+        # Processes the actions of the top are searched in, by MinimaxPAB, Expectimax and Deepimax (its re-engagements
+        # of the top). They are only used when there is no tree to keep, the workers search without one.
+        self.workers = Entities.SearchWorkers
+        # MinimaxPAB with Lazy SMP instead: the workers search the whole top along with this process, with a transposition
+        # table in shared memory, and only fill the table. The tree is kept as usual.
+        self.lazySMP = False
+        # The point of the last PVS search, the window of the next one is around it
+        self.lastPoint = None
+        self.nodeBudget = Entities.MinimaxNodeBudget
+        self.memoryBudget = Entities.MinimaxMemoryBudget
+        self.depthReached = None
+        # If the last search stopped short of 'depth' for its budget, not for the turn time
+        self.budgetHit = False
+        # Seconds a turn may take, the searches then go one depth deeper at a time until it is up (with 'depth' as
+        # the deepest). None or 0 to always search to 'depth'. Plain Minimax with a tree has its budget instead, it makes
+        # its whole tree depth by depth and is not cut in the middle.
+        self.timeLimit = None
+        # Asked before each search if anything is going to use the tree, the tree is always kept when it is None.
+        # Without a tree only the recursion stack and the principal variation are kept.
+        self.needsTree = None
 
     def Action(self, board, turn):
         super().Action(board, turn)
+        # The searches take actions on the board and take them back on their way up,
+        # so they are given a copy and the game board stays untouched
+        board = Entities.Board()
+        board.Copy(self.board)
+        board.SetTurn(turn)
+        self.board = board
+        keepTree = self.needsTree == None or self.needsTree()
+        self.depthReached = None
+        self.budgetHit = False
+
         # Simple raw minimax
         if(self.strategy == Entities.Strategy.Minimax):
-            return Minimax(board = self.board, turn = self.turn, depth = self.depth)
+            if(keepTree):
+                result = Minimax(board = self.board, turn = self.turn, depth = self.depth, nodeBudget = self.nodeBudget, memoryBudget = self.memoryBudget)
+                if(result != None):
+                    self.depthReached = result[1].store.Depth()
+                    self.budgetHit = self.depthReached < self.depth
+                return result
+            # Without a tree only the node budget matters, the stack takes next to no memory. The depths are searched
+            # one after another and the deepest one that fits is taken, the tree stops at the same depth.
+            # With a turn time the depths also stop when it is up, as the other searches do.
+            def Search(depth):
+                budget = None
+                if(self.nodeBudget != None and depth > 1):
+                    budget = [self.nodeBudget]
+                try:
+                    return self.__LineResult(MinimaxLine(board = self.board, depth = 0, maxDepth = depth, isMax = turn == Entities.Turn.Fox, budget = budget))
+                except BudgetExceeded:
+                    self.budgetHit = True
+                    raise
+            seconds = None
+            if(self.timeLimit != None and self.timeLimit > 0):
+                seconds = self.timeLimit * Entities.SearchTimeShare
+            if(self.nodeBudget == None and seconds == None):
+                self.depthReached = self.depth
+                return Search(self.depth)
+            result, self.depthReached = IterativeDeepening(self.board, Search, self.depth, seconds)
+            return result
 
         # The minimax with alpha beta pruning
         if(self.strategy == Entities.Strategy.MinimaxPAB):
             isMax = True
             if(turn == Entities.Turn.Sheeps):
                 isMax = False
-            theNode = MinimaxAlphaBeta(board = board, node = None, depth = 0, maxDebth = self.depth, isMax = isMax, a = -math.inf, b = +math.inf)
-            if(len(theNode.actions) != 0):
-                return theNode.actions.popleft(), theNode.GetTop()
+            lazySMP = self.lazySMP and self.workers > 1
+            ordering = self.__PrepareTable(lazySMP)
+            # Each depth starts with the best actions the one before it kept in the table
+            def Search(depth):
+                if(lazySMP):
+                    return Parallel.LazySearch(self.board, depth, isMax, self.workers, self.transpositionTable, self.quiescence, lambda: TableSearch(depth))
+                return TableSearch(depth)
+            def TableSearch(depth):
+                if(not keepTree and self.workers > 1 and not lazySMP):
+                    actions = TopActions(self.board, isMax, self.transpositionTable, ordering)
+                    result = Parallel.AlphaBetaRoot(self.board, actions, depth, isMax, self.workers, self.quiescence)
+                    if(result != None):
+                        # The next depth starts with this action
+                        StoreSearch(self.transpositionTable, self.board, depth, result[0], Entities.Bound.Exact, result[1][0])
+                    return self.__LineResult(result)
+                if(not keepTree):
+                    return self.__LineResult(MinimaxAlphaBetaLine(board = self.board, depth = 0, maxDebth = depth, isMax = isMax, a = -math.inf, b = +math.inf, table = self.transpositionTable, ordering = ordering, quiescence = self.quiescence))
+                tree = Entities.TreeStore()
+                theNode = MinimaxAlphaBeta(board = self.board, tree = tree, node = 0, depth = 0, maxDebth = depth, isMax = isMax, a = -math.inf, b = +math.inf, table = self.transpositionTable, ordering = ordering, quiescence = self.quiescence)
+                if(theNode != 0):
+                    return self.__Result(tree.Node(theNode))
+            return self.__Search(Search)
+
+        # The principal variation search, in a window around the point of the search before it
+        if(self.strategy == Entities.Strategy.PVS):
+            isMax = turn == Entities.Turn.Fox
+            ordering = self.__PrepareTable()
+            def Search(depth):
+                tree = None
+                if(keepTree):
+                    tree = Entities.TreeStore()
+                # The searches in wider windows go over the same tree
+                def WindowSearch(a, b):
+                    if(tree == None):
+                        result = PrincipalVariationLine(board = self.board, depth = 0, maxDebth = depth, isMax = isMax, a = a, b = b, table = self.transpositionTable, ordering = ordering, quiescence = self.quiescence)
+                        return result[0], result
+                    theNode = PrincipalVariationSearch(board = self.board, tree = tree, node = 0, depth = 0, maxDebth = depth, isMax = isMax, a = a, b = b, table = self.transpositionTable, ordering = ordering, quiescence = self.quiescence)
+                    return tree.Point(0), theNode
+                self.lastPoint, result = AspirationWindows(WindowSearch, self.lastPoint, Entities.AspirationWindow)
+                if(tree == None):
+                    return self.__LineResult(result)
+                if(result != 0):
+                    return self.__Result(tree.Node(result))
+            return self.__Search(Search)
 
         # The expectimax
         if(self.strategy == Entities.Strategy.Expectimax):
             isMax = True
             if(turn == Entities.Turn.Sheeps):
                 isMax = False
-            theNode = Expectimax(board = self.board, node = None, depth = 0, maxDebth = self.depth, isMax = isMax, isExpect = False)
-            if(len(theNode.actions) != 0):
-                return theNode.actions.popleft(), theNode.GetTop()
+            bounds = None
+            if(self.starPruning):
+                bounds = self.board.EvaluationBounds()
+            def Search(depth):
+                if(not keepTree and self.workers > 1):
+                    actions = SearchActions(self.board, isMax, 0)
+                    return self.__LineResult(Parallel.ExpectimaxRoot(self.board, actions, depth, isMax, self.workers, bounds))
+                if(not keepTree):
+                    return self.__LineResult(ExpectimaxLine(board = self.board, depth = 0, maxDebth = depth, isMax = isMax, isExpect = False, bounds = bounds))
+                tree = Entities.TreeStore()
+                theNode = Expectimax(board = self.board, tree = tree, node = 0, depth = 0, maxDebth = depth, isMax = isMax, isExpect = False, bounds = bounds)
+                if(theNode != 0):
+                    return self.__Result(tree.Node(theNode))
+            return self.__Search(Search)
 
         # The deepimax designed by me
         if(self.strategy == Entities.Strategy.Deepimax):
             isMax = True
             if(turn == Entities.Turn.Sheeps):
                 isMax = False
-            theNode = Deepimax(board = self.board, node = None, depth = 0, maxDepth = self.depth, isMax = isMax, doa = self.doa, roa = self.roa)
-            if(len(theNode.actions) != 0):
-                return theNode.actions.popleft(), theNode.GetTop()
+            memo = None
+            if(not keepTree and self.memoMemory != None):
+                if(self.deepimaxMemo == None):
+                    self.deepimaxMemo = Entities.DeepimaxMemo(self.memoMemory)
+                memo = self.deepimaxMemo
+                memo.ResetCounters()
+            def Search(depth):
+                workers = 1 if keepTree else self.workers
+                theNode = Deepimax(board = self.board, node = None, depth = 0, maxDepth = depth, isMax = isMax, doa = self.doa, roa = self.roa, keepTree = keepTree, workers = workers, memo = memo)
+                if(theNode.move != None):
+                    if(not keepTree):
+                        return theNode.GetActions()[0], None
+                    return self.__Result(theNode)
+            return self.__Search(Search)
+
+    # Runs the search (a function of the depth) to the agent's depth, or with the turn time
+    # one depth deeper at a time, the action is then the one of the deepest search that was done
+    def __Search(self, search):
+        if(self.timeLimit == None or self.timeLimit <= 0):
+            self.depthReached = self.depth
+            return search(self.depth)
+        # Deepimax has no action under its depth of accuracy
+        firstDepth = 1
+        if(self.strategy == Entities.Strategy.Deepimax and self.doa != None):
+            firstDepth = max(1, self.doa)
+        result, self.depthReached = IterativeDeepening(self.board, search, self.depth, self.timeLimit * Entities.SearchTimeShare, firstDepth)
+        return result
+
+    # Makes the transposition table ready for a search and returns the move ordering, None when it is off.
+    # Both are kept for the whole game, positions searched for the last move come up again.
+    # shared -> The table is to be a SharedTranspositionTable, for Lazy SMP.
+    def __PrepareTable(self, shared = False):
+        if(self.transpositionTable != None and isinstance(self.transpositionTable, Entities.SharedTranspositionTable) != shared):
+            self.transpositionTable = None
+        if(self.transpositionTable == None):
+            if(shared):
+                self.transpositionTable = Entities.SharedTranspositionTable(self.transpositionMemory)
+            else:
+                self.transpositionTable = Entities.TranspositionTable(self.transpositionMemory)
+        elif(self.transpositionTable.multipliersVersion != Entities.MultipliersVersion):
+            # Its points were found with other multipliers
+            self.transpositionTable.Clear()
+            self.lastPoint = None
+        self.transpositionTable.ResetCounters()
+        if(not self.orderActions):
+            return None
+        if(self.moveOrdering == None):
+            self.moveOrdering = Entities.MoveOrdering()
+        self.moveOrdering.Age()
+        return self.moveOrdering
+
+    # The action to take and the top of the tree. The searches return the node they chose,
+    # the actions from the top to it are the principal variation and the first one is taken.
+    def __Result(self, theNode):
+        principalVariation = theNode.GetActions()
+        return principalVariation[0], theNode.GetTop()
+
+    # The action to take from the point and principal variation of a search without a tree, there is no top to give
+    def __LineResult(self, result):
+        if(result != None and len(result[1]) != 0):
+            return result[1][0], None
+
+    def SearchReport(self):
+        """ A line about what the last search of this agent did, for the console """
+        report = self.title
+        if(self.depthReached != None and self.depthReached != self.depth):
+            if(self.budgetHit):
+                report += " | Depth reached: {0} of {1}, the budget was hit".format(self.depthReached, self.depth)
+            else:
+                report += " | Depth reached: {0} of {1}, the turn time was up".format(self.depthReached, self.depth)
+        if(self.transpositionTable != None):
+            table = self.transpositionTable
+            report += " | Transposition table: {0} probes, {1} hits, {2} stores, {3} collisions".format(
+                table.probes, table.hits, table.stores, table.collisions)
+        if(self.deepimaxMemo != None):
+            memo = self.deepimaxMemo
+            report += " | Re-engagement memo: {0} hits, {1} misses, {2} kept".format(memo.hits, memo.misses, len(memo.results))
+        return report
+
+def IterativeDeepening(board, search, maxDepth, seconds, firstDepth = 1):
+    """
+    Searches to depth firstDepth, firstDepth + 1... up to maxDepth until the seconds are up (None for no limit,
+    the depths are then searched until one of them raises SearchTimeout, as a search over its budget does).
+    Returns (result, depth) of the deepest search that gave a result, a search cut by the deadline is thrown away.
+    The depths are searched to the end until one of them gives a result, so there is always one when any depth has it.
+
+    search -> A function of the depth that searches the board to it and returns its result, None for no action.
+    firstDepth -> The depth to start from, a search that is too shallow to give an action is not worth the time.
+    """
+    global searchDeadline
+    deadline = None
+    if(seconds != None):
+        deadline = Time.datetime.now() + Time.timedelta(seconds = seconds)
+    snapshot = board.Snapshot()
+    result = None
+    depthDone = None
+    lastTook = None
+
+    for depth in range(min(firstDepth, maxDepth), maxDepth + 1):
+        now = Time.datetime.now()
+        # A deeper search takes longer than the one before it, when that does not fit in the time left it is not started
+        if(depthDone != None and deadline != None and now + lastTook > deadline):
+            break
+        searchDeadline = None if depthDone == None else deadline
+        try:
+            depthResult = search(depth)
+        except SearchTimeout:
+            # The board was left in the middle of the search
+            board.Restore(snapshot)
+            break
+        finally:
+            searchDeadline = None
+        # A depth without an action does not take the place of the one before it
+        if(depthResult == None):
+            continue
+        result = depthResult
+        depthDone = depth
+        lastTook = Time.datetime.now() - now
+    return result, depthDone
+
+def CheckDeadline():
+    """ Raises SearchTimeout when the running search has a deadline and it has passed, or it was told to stop """
+    if(searchDeadline != None and Time.datetime.now() >= searchDeadline):
+        raise SearchTimeout()
+    if(searchStop != None and searchStop.value):
+        raise SearchTimeout()
 
-def Minimax(board, turn, depth):
+def ApplyActions(board, actions):
+    """
+    Takes the actions on the board one after another and returns their captures,
+    which ReverseActions needs to take them back.
+    """
+    captures = []
+    for action in actions:
+        captures.append(board.Action(action[0], action[1]))
+    return captures
+
+def ReverseActions(board, actions, captures):
+    """ Takes back the actions taken by ApplyActions, from the last one to the first one """
+    for i in range(len(actions) -1, -1, -1):
+        board.ReverseAction(actions[i][0], actions[i][1], captures[i])
+
+def Minimax(board, turn, depth, nodeBudget = None, memoryBudget = None):
     """ 
     Returns and action (start, end) which start and end are 2D tuples representing
     positions in the board.
@@ -73,6 +346,8 @@ def Minimax(board, turn, depth):
     board -> Gets the current board and calculate on it.
     isFox -> Determining which side of the board (Sheep or fox) now taking a turn.
     window -> Getting the main window in the graphics for updating purposes.
+    nodeBudget, memoryBudget -> The most nodes and bytes the tree may take, None for no limit. When the next depth
+    would not fit, the tree stops at the depth it has and is evaluated there, the first depth is always made.
     """
     """
     Minimax: Creates a table of decisions based on all available actions for each side of the 
@@ -90,308 +365,905 @@ def Minimax(board, turn, depth):
         isFox = False
 
     currentDepth = 0
-    top = Entities.MinimaxTreeNode(currentDepth)
-    top.actions = queue.Queue().queue
+    tree = Entities.TreeStore()
+
+    # The nodes of the current depth go with their positions, so making their children is one action away
+    # instead of replaying them all. With NumPy the positions are packed and a whole depth is expanded at once,
+    # otherwise each node goes with a snapshot of its board.
+    rootSnapshot = board.Snapshot()
+    nodes = [0]
+    if(Vectorized.Available):
+        frontier = Vectorized.PackSnapshots([rootSnapshot])
+    else:
+        frontier = [rootSnapshot]
 
     # Going as deeply as we want, a depth limited. It can be break by minimaxBreak
     while(algorithmBreak == False and currentDepth != depth):
-
-        # Getting all the noes in the current depth
-        states = top.GetDepthNodes(currentDepth)
-        if(states == None):
+        if(currentDepth == 0):
+            budget = (None, None)
+        else:
+            budget = (nodeBudget, memoryBudget)
+        if(Vectorized.Available):
+            expansion = ExpandPackedFrontier(board, tree, nodes, frontier, isFox, currentDepth, budget)
+        else:
+            expansion = ExpandFrontier(board, tree, nodes, frontier, isFox, currentDepth, budget)
+        if(expansion == None):
+            # The next depth does not fit in the budget, the leaves are evaluated where they are
             break
-
-        # Looping over all same depth nodes for updating board and make their children
-        for s in states:
-            # Creating a copy of the current board
-            currentBoard = Entities.Board()
-            currentBoard.Copy(board)
-            priviousActions = s.actions.copy()
-
-            # Loop over all actions  respectably in this state and update the board
-            for i in range(s.actions.__len__()):
-                action = s.actions.popleft()
-                currentBoard.Action(action[0], action[1])
-
-            availableActions = []
-            # If this is fox turn
-            if(isFox == True):      
-                availableActions = currentBoard.AvailableActionsFox()
-            # If this is sheeps turn
-            elif(isFox == False):                    
-                availableActions = currentBoard.AvailableActionsSheep()
-
-            # Loop over all available actions and for each make a child and assign to this state
-            for a in availableActions:
-                child = Entities.MinimaxTreeNode(currentDepth+1)
-                newActions = priviousActions.copy()
-                newActions.append(a)
-                child.actions = newActions
-                child.parent = s
-                s.AddChildren(child)
-
+        nodes, frontier = expansion
         currentDepth += 1
         isFox = not isFox
 
+    # Evaluating the leaves of the last depth, all in one batch
+    if(Vectorized.Available):
+        points = Vectorized.EvaluatePacked(frontier, board.sheepsMax).tolist()
+    else:
+        points = Vectorized.EvaluateSnapshots(board, frontier)
+    for i in range(len(nodes)):
+        tree.points[nodes[i]] = points[i]
+    board.Restore(rootSnapshot)
+
     # Filling the tree is done, now we select the appropriate action
     isFox = True
     if(turn == Entities.Turn.Sheeps):
         isFox = False
 
-    TheNode = MiniMaxValue(board, top, isFox)
+    TheNode = MiniMaxValue(tree, isFox)
 
-    # Returning the calculated action
+    # Returning the first action of the principal variation, the actions from the top to the chosen leaf
     if(algorithmBreak == False):
-        if(len(TheNode.actions) != 0):
-            return TheNode.actions.popleft(), top
+        if(TheNode != 0):
+            return tree.Actions(TheNode)[0], tree.Node(0)
     else:
         algorithmBreak = False
 
-def MiniMaxValue(board, node, isMax):
+def WithinBudget(tree, children, bytesPerChild, transientBytes, budget):
+    """
+    If the tree can take 'children' more nodes for its next depth. The bytes are the tree with them, a copy of it as
+    its arrays grow, bytesPerChild for each new node and its position, and transientBytes taken for the time being.
+    budget -> (nodes, bytes) the tree may take, None for no limit.
     """
-    Gets the made tree top node and going through it recursively
-    to min or max over children
+    nodeBudget, memoryBudget = budget
+    nodes = len(tree) + children
+    if(nodeBudget != None and nodes > nodeBudget):
+        return False
+    treeBytes = (nodes + len(tree)) * Entities.TreeStore.NODEBYTES
+    if(memoryBudget != None and treeBytes + children * bytesPerChild + transientBytes > memoryBudget):
+        return False
+    return True
 
-    board -> Getting the current board
-    node -> top node of created miniMax tree 
-    isMax -> Is this iteration of recursive for maxing over children or mining
+def ExpandFrontier(board, tree, nodes, snapshots, isFox, depth, budget = (None, None)):
     """
+    Adds the children of the nodes of one depth of the Minimax tree, each node given with the snapshot of its board.
+    Nodes without any action are evaluated, as they are leaves already.
+    Returns the children and their snapshots, or None with the tree untouched when they do not fit in the budget.
+    """
+    # Counting the children of all same depth nodes first, the actions are not kept so a depth that does not fit takes no memory
+    if(budget != (None, None)):
+        count = 0
+        for snapshot in snapshots:
+            board.Restore(snapshot)
+            count += len(FrontierActions(board, isFox, depth))
+        if(not WithinBudget(tree, count, Entities.Board.SNAPSHOTBYTES, 0, budget)):
+            return None
+
+    nextNodes = []
+    nextSnapshots = []
+
+    # Looping over all same depth nodes for updating board and make their children
+    for i in range(len(nodes)):
+        node = nodes[i]
+        board.Restore(snapshots[i])
+        availableActions = FrontierActions(board, isFox, depth)
+
+        # A state without any action is a leaf already
+        if(len(availableActions) == 0):
+            tree.points[node] = Entities.evaluationCache.Evaluate(board)
+            continue
+
+        # Make a child for each available action, with the snapshot of the board after it
+        nextNodes.extend(tree.AddChildren(node, availableActions))
+        for a in availableActions:
+            captured = board.Action(a[0], a[1])
+            nextSnapshots.append(board.Snapshot())
+            board.ReverseAction(a[0], a[1], captured)
+
+    return nextNodes, nextSnapshots
+
+def FrontierActions(board, isFox, depth):
+    """ The actions of a node of the Minimax tree at the depth, the board is at its position """
+    availableActions = []
+    # If this is fox turn
+    if(isFox == True):
+        availableActions = board.AvailableActionsFox()
+    # If this is sheeps turn
+    elif(isFox == False):
+        availableActions = board.AvailableActionsSheep()
+
+    # Mirrored twins of a symmetric top are worth the same, one of each is enough
+    if(depth == 0):
+        availableActions = board.DropMirroredActions(availableActions)
+    return availableActions
+
+def ExpandPackedFrontier(board, tree, nodes, packed, isFox, depth, budget = (None, None)):
     """
-    MinimaxValue: Going from top to bottom of the tree and min and maxing over
-    nodes considering isMax variable and returning the min or max node in each parent.
-    In the end the nominated node returns with its evaluation function point.
+    ExpandFrontier for packed positions, the actions and positions of all the children are generated at once.
+    The board is only used at the top, it has to be at the position of the top node there.
     """
+    if(not WithinBudget(tree, 0, 0, len(packed) * Vectorized.EXPANDBYTES, budget)):
+        return None
+    parents, starts, ends, children = Vectorized.ExpandPacked(packed, isFox)
 
-    # If this node has no children
-    if(len(node.GetChildren()) == 0):
-        # Making a copy of the board 
-        currentBoard = Entities.Board()
-        currentBoard.Copy(board)
-        currentActions = node.actions.copy()
+    # Mirrored twins of a symmetric top are worth the same, one of each is enough
+    if(depth == 0 and board.IsSymmetric()):
+        actions = [(Entities.CELLS[starts[i]], Entities.CELLS[ends[i]]) for i in range(len(starts))]
+        kept = board.DropMirroredActions(actions)
+        rows = [i for i in range(len(actions)) if actions[i] in kept]
+        parents, starts, ends, children = parents[rows], starts[rows], ends[rows], children[rows]
 
-        # Looping over all actions in this node and updating the board
-        for i in range(currentActions.__len__()):
-            action = currentActions.popleft()
-            currentBoard.Action(action[0], action[1])
-        
-        # Calculating the evaluation Function point
-        node.point = currentBoard.EvaluationFunction()
+    if(not WithinBudget(tree, len(parents), Vectorized.LEVELBYTES, 0, budget)):
+        return None
 
-        # returning this node
-        return node
-    
-    # if this node has children
-    else:
-        # Recurse to children
-        subNodes = []
-        for child in node.GetChildren():
-            subNodes.append(MiniMaxValue(board, child, not isMax))
+    # States without any action are leaves already
+    leaves = Vectorized.ChildlessRows(parents, len(nodes))
+    if(len(leaves) != 0):
+        points = Vectorized.EvaluatePacked(packed[leaves], board.sheepsMax).tolist()
+        for i in range(len(leaves)):
+            tree.points[nodes[leaves[i]]] = points[i]
 
-        # If its the max turn, max over children nodes and return the max
-        if(isMax):
-            maxNode = max(subNodes, key = lambda x: x.point)
-            node.point = maxNode.point
-            return maxNode
-        # If its the min turn, min over children nodes and return the min
+    nextNodes = tree.AddLevel(nodes, parents.tolist(), Vectorized.EncodeMoves(starts, ends))
+    return nextNodes, children
+
+def MiniMaxValue(tree, isMax):
+    """
+    Min and maxes over the children of each node of the made tree, whose leaves are already evaluated.
+    Children come after their parent in the tree, so going over the nodes from the last one
+    gives every child its point before its parent is reached.
+    Returns the leaf that the point of the top comes from.
+
+    isMax -> Is the top maxing over its children or mining
+    """
+    points = tree.points
+    depths = tree.depths
+    firstChildren = tree.firstChildren
+    childCounts = tree.childCounts
+
+    for node in range(len(tree) - 1, -1, -1):
+        count = childCounts[node]
+        if(count == 0):
+            continue
+        first = firstChildren[node]
+        # Max on the depths of the top's side, min on the others
+        if((depths[node] % 2 == 0) == isMax):
+            points[node] = max(points[first:first + count])
         else:
-            minNode = min(subNodes, key = lambda x: x.point)
-            node.point = minNode.point
-            return minNode
+            points[node] = min(points[first:first + count])
+
+    # Going down the children that gave each point, the first one of them as max and min do
+    node = 0
+    while(childCounts[node] != 0):
+        first = firstChildren[node]
+        node = first + points[first:first + childCounts[node]].index(points[node])
+    return node
 
-def MinimaxAlphaBeta(board, node, depth, maxDebth, isMax, a, b):
+def MinimaxLine(board, depth, maxDepth, isMax, budget = None):
+    """
+    Minimax without a tree, going depth first so only the recursion stack is kept.
+    Returns (point, line), line is the principal variation from this position, the actions that lead to the point.
+    It gives the same point and line as Minimax, ties go to the first action as there.
+    The board is at the position of the search and is left there.
+    budget -> A list with the nodes the search may still go over, as many as the tree would have. BudgetExceeded is
+    raised when they are used up. None for no limit.
+    """
+    CheckDeadline()
+
+    if(budget != None):
+        budget[0] -= 1
+        if(budget[0] < 0):
+            raise BudgetExceeded()
+
+    # The last plies are searched full width at once with NumPy, their memory does not depend on the depth
+    if(Vectorized.Available and depth != 0 and maxDepth - depth <= Vectorized.BATCHPLIES):
+        result = Vectorized.MinimaxPacked(board, isMax, maxDepth - depth, budget)
+        if(result == None):
+            raise BudgetExceeded()
+        return result
+
+    # Get list of available actions
+    availableActions = []
+    if(isMax):
+        availableActions = board.AvailableActionsFox()
+    else:
+        availableActions = board.AvailableActionsSheep()
+    if(depth == 0):
+        availableActions = board.DropMirroredActions(availableActions)
+
+    # Check the leave (We are in the last depth or we have no children)
+    if(depth == maxDepth or len(availableActions) == 0):
+        return Entities.evaluationCache.Evaluate(board), ()
+
+    best = None
+    for action in availableActions:
+        captured = board.Action(action[0], action[1])
+        point, line = MinimaxLine(board, depth + 1, maxDepth, not isMax, budget)
+        board.ReverseAction(action[0], action[1], captured)
+        if(best == None or (isMax and point > best[0]) or (not isMax and point < best[0])):
+            best = (point, (action,) + line)
+    return best
+
+def MinimaxAlphaBeta(board, tree, node, depth, maxDebth, isMax, a, b, table = None, ordering = None, quiescence = 0):
     """ 
     The minimax Method with alpha beta pruning. 
-    Returns a node
+    Returns a node, or None when this node is cut, which its parent then passes over.
+    The board is at the position of the node, it is left there when returning.
+    tree -> The TreeStore the node is in, the children are added to it.
+    table -> A transposition table, positions found there with a deep enough search are not searched again.
+    ordering -> An Entities.MoveOrdering the actions are searched in, it learns from the cuts.
+    quiescence -> Plies the leaves of the last depth are searched on with Quiescence, 0 to evaluate them as they are.
     """
-    
-    # Creating the node
-    if(depth == 0):
-        node = Entities.MinimaxTreeNode(0)
-        node.actions = queue.Queue().queue
+    CheckDeadline()
 
-    # Creating a new instance of the board
-    currentBoard = Entities.Board()
-    currentBoard.Copy(board)
-    previousActions = node.actions.copy()
+    points = tree.points
 
-    # Updating the board
-    for i in range(previousActions.__len__()):
-        action = previousActions.popleft()
-        currentBoard.Action(action[0], action[1])
+    # Looking the position up in the transposition table
+    tableAction = None
+    if(table != None):
+        entry = table.Probe(board.CanonicalKey())
+        if(entry != None):
+            _, entryDepth, point, bound, tableAction = entry
+            if(tableAction != None and board.IsMirrored()):
+                tableAction = Entities.MirrorAction(tableAction)
+            if(depth != 0 and entryDepth >= maxDebth - depth):
+                if(bound == Entities.Bound.Exact or
+                    (bound == Entities.Bound.Lower and point >= b) or
+                    (bound == Entities.Bound.Upper and point <= a)):
+                    points[node] = point
+                    # A bound beyond the window is a cut, either here or in the parent
+                    if((isMax and bound == Entities.Bound.Lower) or (not isMax and bound == Entities.Bound.Upper)):
+                        return None
+                    return node
 
     # Get list of available actions
     availableActions = []
     if(isMax):      
-        availableActions = currentBoard.AvailableActionsFox()
+        availableActions = board.AvailableActionsFox()
     else:                
-        availableActions = currentBoard.AvailableActionsSheep()
+        availableActions = board.AvailableActionsSheep()
+    if(depth == 0):
+        availableActions = board.DropMirroredActions(availableActions)
 
     # Check the leave (We are in the last depth or we have no children)
     if(depth == maxDebth or availableActions.__len__() == 0):
-        node.point = currentBoard.EvaluationFunction()
+        points[node] = LeafPoint(board, isMax, a, b, quiescence)
         return node
 
+    # The best action found by an earlier search of this position goes first, after the captures with an ordering
+    if(ordering != None):
+        availableActions = ordering.Order(availableActions, depth, tableAction, isMax)
+    elif(tableAction in availableActions):
+        availableActions.remove(tableAction)
+        availableActions.insert(0, tableAction)
+
     # Make the children
-    for action in availableActions:
-        child = Entities.MinimaxTreeNode(depth + 1)
-        newActions = node.actions.copy()
-        newActions.append(action)
-        child.actions = newActions
-        child.parent = node
-        node.AddChildren(child)
+    children = tree.AddChildren(node, availableActions)
 
     # Actual minimax with alpha beta pruning code
+    originalA = a
+    originalB = b
     if(isMax):
         v = -math.inf
         childNode = None
-        for child in node.children:
-            temp = MinimaxAlphaBeta(board, child, depth +1, maxDebth, False, a, b)
+        for child, action in zip(children, availableActions):
+            captured = board.Action(action[0], action[1])
+            temp = MinimaxAlphaBeta(board, tree, child, depth +1, maxDebth, False, a, b, table, ordering, quiescence)
+            board.ReverseAction(action[0], action[1], captured)
             if(temp == None):
                 continue
-            if(temp.point > v):
+            if(points[temp] > v):
                 childNode = temp
-                v = temp.point
+                v = points[temp]
+                bestAction = action
             if(v >= b):
+                StoreSearch(table, board, maxDebth - depth, v, Entities.Bound.Lower, bestAction)
+                if(ordering != None):
+                    ordering.Cut(bestAction, depth, maxDebth - depth, isMax)
                 return None
             a = max(a, v)
-        node.point = v
+        if(childNode == None):
+            # Every child was cut, so this node is worth at most 'a' and the parent cuts on it
+            points[node] = originalA
+            StoreSearch(table, board, maxDebth - depth, originalA, Entities.Bound.Upper, None)
+            return node
+        points[node] = v
+        if(v <= originalA):
+            StoreSearch(table, board, maxDebth - depth, originalA, Entities.Bound.Upper, None)
+        else:
+            StoreSearch(table, board, maxDebth - depth, v, Entities.Bound.Exact, bestAction)
         return childNode
     else:
         v = math.inf
         childNode = None
-        for child in node.children:
-            temp = MinimaxAlphaBeta(board, child, depth +1, maxDebth, True, a, b)
+        for child, action in zip(children, availableActions):
+            captured = board.Action(action[0], action[1])
+            temp = MinimaxAlphaBeta(board, tree, child, depth +1, maxDebth, True, a, b, table, ordering, quiescence)
+            board.ReverseAction(action[0], action[1], captured)
             if(temp == None):
                 continue
-            if(temp.point < v):
+            if(points[temp] < v):
                 childNode = temp
-                v = temp.point
+                v = points[temp]
+                bestAction = action
             if(v <= a):
+                StoreSearch(table, board, maxDebth - depth, v, Entities.Bound.Upper, bestAction)
+                if(ordering != None):
+                    ordering.Cut(bestAction, depth, maxDebth - depth, isMax)
                 return None
-            b = min(a, v)
-        node.point = v
+            b = min(b, v)
+        if(childNode == None):
+            # Every child was cut, so this node is worth at least 'b' and the parent cuts on it
+            points[node] = originalB
+            StoreSearch(table, board, maxDebth - depth, originalB, Entities.Bound.Lower, None)
+            return node
+        points[node] = v
+        if(v >= originalB):
+            StoreSearch(table, board, maxDebth - depth, originalB, Entities.Bound.Lower, None)
+        else:
+            StoreSearch(table, board, maxDebth - depth, v, Entities.Bound.Exact, bestAction)
         return childNode
 
-def Expectimax(board, node, depth, maxDebth, isMax, isExpect):
-    """ The expectimax algorithm """
-        # Creating the node
+def StoreSearch(table, board, depth, point, bound, action):
+    """
+    Keeps the search of the board position in the transposition table, if there is one.
+    Mirrored positions share their entry, so the action is kept as it is on the canonical side.
+    """
+    if(table != None and not math.isinf(point)):
+        if(action != None and board.IsMirrored()):
+            action = Entities.MirrorAction(action)
+        table.Store(board.CanonicalKey(), depth, point, bound, action)
+
+def MinimaxAlphaBetaLine(board, depth, maxDebth, isMax, a, b, table = None, ordering = None, quiescence = 0):
+    """
+    MinimaxAlphaBeta without a tree, only the recursion stack is kept.
+    Returns (point, line), line is the principal variation from this position, or None when this position is cut.
+    The points, cuts and table entries are the same as MinimaxAlphaBeta's.
+    """
+    CheckDeadline()
+
+    # Looking the position up in the transposition table
+    tableAction = None
+    if(table != None):
+        entry = table.Probe(board.CanonicalKey())
+        if(entry != None):
+            _, entryDepth, point, bound, tableAction = entry
+            if(tableAction != None and board.IsMirrored()):
+                tableAction = Entities.MirrorAction(tableAction)
+            if(depth != 0 and entryDepth >= maxDebth - depth):
+                if(bound == Entities.Bound.Exact or
+                    (bound == Entities.Bound.Lower and point >= b) or
+                    (bound == Entities.Bound.Upper and point <= a)):
+                    # A bound beyond the window is a cut, either here or in the parent
+                    if((isMax and bound == Entities.Bound.Lower) or (not isMax and bound == Entities.Bound.Upper)):
+                        return None
+                    return point, ()
+
+    # Get list of available actions
+    availableActions = []
+    if(isMax):
+        availableActions = board.AvailableActionsFox()
+    else:
+        availableActions = board.AvailableActionsSheep()
+    if(depth == 0):
+        availableActions = board.DropMirroredActions(availableActions)
+
+    # Check the leave (We are in the last depth or we have no children)
+    if(depth == maxDebth or len(availableActions) == 0):
+        return LeafPoint(board, isMax, a, b, quiescence), ()
+
+    # The best action found by an earlier search of this position goes first, after the captures with an ordering
+    if(ordering != None):
+        availableActions = ordering.Order(availableActions, depth, tableAction, isMax)
+    elif(tableAction in availableActions):
+        availableActions.remove(tableAction)
+        availableActions.insert(0, tableAction)
+
+    originalA = a
+    originalB = b
+    best = None
+    if(isMax):
+        v = -math.inf
+        for action in availableActions:
+            captured = board.Action(action[0], action[1])
+            temp = MinimaxAlphaBetaLine(board, depth +1, maxDebth, False, a, b, table, ordering, quiescence)
+            board.ReverseAction(action[0], action[1], captured)
+            if(temp == None):
+                continue
+            if(temp[0] > v):
+                v = temp[0]
+                best = (v, (action,) + temp[1])
+            if(v >= b):
+                StoreSearch(table, board, maxDebth - depth, v, Entities.Bound.Lower, best[1][0])
+                if(ordering != None):
+                    ordering.Cut(best[1][0], depth, maxDebth - depth, isMax)
+                return None
+            a = max(a, v)
+        if(best == None):
+            # Every child was cut, so this position is worth at most 'a' and the parent cuts on it
+            StoreSearch(table, board, maxDebth - depth, originalA, Entities.Bound.Upper, None)
+            return originalA, ()
+        if(v <= originalA):
+            StoreSearch(table, board, maxDebth - depth, originalA, Entities.Bound.Upper, None)
+        else:
+            StoreSearch(table, board, maxDebth - depth, v, Entities.Bound.Exact, best[1][0])
+        return best
+    else:
+        v = math.inf
+        for action in availableActions:
+            captured = board.Action(action[0], action[1])
+            temp = MinimaxAlphaBetaLine(board, depth +1, maxDebth, True, a, b, table, ordering, quiescence)
+            board.ReverseAction(action[0], action[1], captured)
+            if(temp == None):
+                continue
+            if(temp[0] < v):
+                v = temp[0]
+                best = (v, (action,) + temp[1])
+            if(v <= a):
+                StoreSearch(table, board, maxDebth - depth, v, Entities.Bound.Upper, best[1][0])
+                if(ordering != None):
+                    ordering.Cut(best[1][0], depth, maxDebth - depth, isMax)
+                return None
+            b = min(b, v)
+        if(best == None):
+            # Every child was cut, so this position is worth at least 'b' and the parent cuts on it
+            StoreSearch(table, board, maxDebth - depth, originalB, Entities.Bound.Lower, None)
+            return originalB, ()
+        if(v >= originalB):
+            StoreSearch(table, board, maxDebth - depth, originalB, Entities.Bound.Lower, None)
+        else:
+            StoreSearch(table, board, maxDebth - depth, v, Entities.Bound.Exact, best[1][0])
+        return best
+
+def AspirationWindows(search, guess, window):
+    """
+    Runs search(a, b) in a window of 'window' points on each side of the guessed point and returns its (point, result).
+    When the point falls out of the window, that side is made four times wider and it is searched again.
+    Without a guess the whole window is searched.
+    """
+    if(guess == None):
+        return search(-math.inf, math.inf)
+    below = window
+    above = window
+    while(True):
+        a = guess - below
+        b = guess + above
+        point, result = search(a, b)
+        if(point <= a):
+            below *= 4
+        elif(point >= b):
+            above *= 4
+        else:
+            return point, result
+
+def PrincipalVariationSearch(board, tree, node, depth, maxDebth, isMax, a, b, table = None, ordering = None, quiescence = 0):
+    """
+    The principal variation search. The first child is searched in the whole window, the others in a null window
+    which only tells if they are better than the best one yet, and they are searched again in the whole window when they are.
+    The points are fail soft, a point out of the window is a bound of the real one. Returns the leaf of the principal variation.
+    The board is at the position of the node, it is left there when returning.
+    tree -> The TreeStore the node is in. When the node already has children from an earlier search they are searched again.
+    table, ordering, quiescence -> As in MinimaxAlphaBeta.
+    """
+    CheckDeadline()
+
+    points = tree.points
+
+    # Looking the position up in the transposition table
+    tableAction = None
+    if(table != None):
+        entry = table.Probe(board.CanonicalKey())
+        if(entry != None):
+            _, entryDepth, point, bound, tableAction = entry
+            if(tableAction != None and board.IsMirrored()):
+                tableAction = Entities.MirrorAction(tableAction)
+            if(depth != 0 and entryDepth >= maxDebth - depth):
+                if(bound == Entities.Bound.Exact or
+                    (bound == Entities.Bound.Lower and point >= b) or
+                    (bound == Entities.Bound.Upper and point <= a)):
+                    points[node] = point
+                    return node
+
+    # Check the leave (We are in the last depth)
+    if(depth == maxDebth):
+        points[node] = LeafPoint(board, isMax, a, b, quiescence)
+        return node
+
+    children = tree.Children(node)
+    if(len(children) != 0):
+        availableActions = [tree.Action(child) for child in children]
+    else:
+        availableActions = SearchActions(board, isMax, depth)
+        # Check the leave (We have no children)
+        if(len(availableActions) == 0):
+            points[node] = Entities.evaluationCache.Evaluate(board)
+            return node
+        if(ordering != None):
+            availableActions = ordering.Order(availableActions, depth, tableAction, isMax)
+        elif(tableAction in availableActions):
+            availableActions.remove(tableAction)
+            availableActions.insert(0, tableAction)
+        children = tree.AddChildren(node, availableActions)
+
+    originalA = a
+    originalB = b
+    v = -math.inf if isMax else math.inf
+    childNode = None
+    bestAction = None
+    for child, action in zip(children, availableActions):
+        captured = board.Action(action[0], action[1])
+        if(childNode == None):
+            temp = PrincipalVariationSearch(board, tree, child, depth +1, maxDebth, not isMax, a, b, table, ordering, quiescence)
+        else:
+            # The points are integers, so a window one point wide is enough
+            if(isMax):
+                temp = PrincipalVariationSearch(board, tree, child, depth +1, maxDebth, False, a, a + 1, table, ordering, quiescence)
+            else:
+                temp = PrincipalVariationSearch(board, tree, child, depth +1, maxDebth, True, b - 1, b, table, ordering, quiescence)
+            if(a < points[child] < b):
+                temp = PrincipalVariationSearch(board, tree, child, depth +1, maxDebth, not isMax, a, b, table, ordering, quiescence)
+        board.ReverseAction(action[0], action[1], captured)
+
+        point = points[child]
+        if(childNode == None or (isMax and point > v) or (not isMax and point < v)):
+            childNode = temp
+            v = point
+            bestAction = action
+        if(isMax):
+            a = max(a, v)
+        else:
+            b = min(b, v)
+        if(a >= b):
+            if(ordering != None):
+                ordering.Cut(action, depth, maxDebth - depth, isMax)
+            break
+
+    points[node] = v
+    StoreBound(table, board, maxDebth - depth, v, originalA, originalB, isMax, bestAction)
+    return childNode
+
+def PrincipalVariationLine(board, depth, maxDebth, isMax, a, b, table = None, ordering = None, quiescence = 0):
+    """
+    PrincipalVariationSearch without a tree, only the recursion stack is kept.
+    Returns (point, line), line is the principal variation from this position.
+    The points and table entries are the same as PrincipalVariationSearch's.
+    """
+    CheckDeadline()
+
+    # Looking the position up in the transposition table
+    tableAction = None
+    if(table != None):
+        entry = table.Probe(board.CanonicalKey())
+        if(entry != None):
+            _, entryDepth, point, bound, tableAction = entry
+            if(tableAction != None and board.IsMirrored()):
+                tableAction = Entities.MirrorAction(tableAction)
+            if(depth != 0 and entryDepth >= maxDebth - depth):
+                if(bound == Entities.Bound.Exact or
+                    (bound == Entities.Bound.Lower and point >= b) or
+                    (bound == Entities.Bound.Upper and point <= a)):
+                    return point, ()
+
+    # Check the leave (We are in the last depth or we have no children)
+    if(depth == maxDebth):
+        return LeafPoint(board, isMax, a, b, quiescence), ()
+    availableActions = SearchActions(board, isMax, depth)
+    if(len(availableActions) == 0):
+        return Entities.evaluationCache.Evaluate(board), ()
+    if(ordering != None):
+        availableActions = ordering.Order(availableActions, depth, tableAction, isMax)
+    elif(tableAction in availableActions):
+        availableActions.remove(tableAction)
+        availableActions.insert(0, tableAction)
+
+    originalA = a
+    originalB = b
+    best = None
+    for action in availableActions:
+        captured = board.Action(action[0], action[1])
+        if(best == None):
+            temp = PrincipalVariationLine(board, depth +1, maxDebth, not isMax, a, b, table, ordering, quiescence)
+        else:
+            # The points are integers, so a window one point wide is enough
+            if(isMax):
+                temp = PrincipalVariationLine(board, depth +1, maxDebth, False, a, a + 1, table, ordering, quiescence)
+            else:
+                temp = PrincipalVariationLine(board, depth +1, maxDebth, True, b - 1, b, table, ordering, quiescence)
+            if(a < temp[0] < b):
+                temp = PrincipalVariationLine(board, depth +1, maxDebth, not isMax, a, b, table, ordering, quiescence)
+        board.ReverseAction(action[0], action[1], captured)
+
+        if(best == None or (isMax and temp[0] > best[0]) or (not isMax and temp[0] < best[0])):
+            best = (temp[0], (action,) + temp[1])
+        if(isMax):
+            a = max(a, best[0])
+        else:
+            b = min(b, best[0])
+        if(a >= b):
+            if(ordering != None):
+                ordering.Cut(action, depth, maxDebth - depth, isMax)
+            break
+
+    StoreBound(table, board, maxDebth - depth, best[0], originalA, originalB, isMax, best[1][0])
+    return best
+
+def LeafPoint(board, isMax, a, b, quiescence):
+    """ The point of a leaf of the alpha beta searches in the (a, b) window, searched on with Quiescence for 'quiescence' plies """
+    if(quiescence == 0):
+        return Entities.evaluationCache.Evaluate(board)
+    return Quiescence(board, isMax, a, b, quiescence)
+
+def Quiescence(board, isMax, a, b, plies):
+    """
+    The point of a leaf searched on with only the fox's captures and the sheeps' actions that block them,
+    until no capture is left or 'plies' are taken, so the point is not taken in the middle of a capture.
+    The fox may always keep the point of the position as it is (stand pat) instead of capturing, capturing is not a must.
+    The sheeps may take another action instead of blocking, but then the fox still has its captures: that is searched
+    as a null move into the fox's captures, which takes no ply. The points are fail soft.
+    """
+    CheckDeadline()
+
+    point = Entities.evaluationCache.Evaluate(board)
+    if(plies == 0):
+        return point
+    if(isMax):
+        actions = board.AvailableCapturesFox()
+    else:
+        actions = board.CaptureBlocksSheep()
+        # Not blocking leaves the captures open, the point is then the one after the fox's best capture
+        if(len(board.AvailableCapturesFox()) != 0):
+            point = Quiescence(board, True, a, b, plies)
+
+    # A quiet position, or the point of standing pat is already out of the window
+    if(len(actions) == 0 or (isMax and point >= b) or (not isMax and point <= a)):
+        return point
+
+    for action in actions:
+        if(isMax):
+            a = max(a, point)
+        else:
+            b = min(b, point)
+        if(a >= b):
+            break
+        captured = board.Action(action[0], action[1])
+        temp = Quiescence(board, not isMax, a, b, plies - 1)
+        board.ReverseAction(action[0], action[1], captured)
+        if((isMax and temp > point) or (not isMax and temp < point)):
+            point = temp
+    return point
+
+def TopActions(board, isMax, table, ordering):
+    """ The actions of the top of an alpha beta search in the order to search them, the table's action first """
+    tableAction = None
+    if(table != None):
+        entry = table.Probe(board.CanonicalKey())
+        if(entry != None):
+            tableAction = entry[4]
+            if(tableAction != None and board.IsMirrored()):
+                tableAction = Entities.MirrorAction(tableAction)
+    availableActions = SearchActions(board, isMax, 0)
+    if(ordering != None):
+        return ordering.Order(availableActions, 0, tableAction, isMax)
+    if(tableAction in availableActions):
+        availableActions.remove(tableAction)
+        availableActions.insert(0, tableAction)
+    return availableActions
+
+def SearchActions(board, isMax, depth):
+    """ The actions of the side of a search at the depth, the mirrored twins at the top are left out """
+    if(isMax):
+        availableActions = board.AvailableActionsFox()
+    else:
+        availableActions = board.AvailableActionsSheep()
     if(depth == 0):
-        node = Entities.MinimaxTreeNode(0)
-        node.actions = queue.Queue().queue
+        availableActions = board.DropMirroredActions(availableActions)
+    return availableActions
 
-    # Creating a new instance of the board
-    currentBoard = Entities.Board()
-    currentBoard.Copy(board)
-    previousActions = node.actions.copy()
+def StoreBound(table, board, depth, point, a, b, isMax, action):
+    """
+    Keeps a fail soft point of a search in the (a, b) window in the transposition table, as the bound it is.
+    The action is only kept when it is the best one, not when every action was worse than the window.
+    """
+    if(point <= a):
+        bound = Entities.Bound.Upper
+    elif(point >= b):
+        bound = Entities.Bound.Lower
+    else:
+        bound = Entities.Bound.Exact
+    if((isMax and bound == Entities.Bound.Upper) or (not isMax and bound == Entities.Bound.Lower)):
+        action = None
+    StoreSearch(table, board, depth, point, bound, action)
 
-    # Updating the board
-    for i in range(previousActions.__len__()):
-        action = previousActions.popleft()
-        currentBoard.Action(action[0], action[1])
+def Expectimax(board, tree, node, depth, maxDebth, isMax, isExpect, a = -math.inf, bounds = None):
+    """
+    The expectimax algorithm, the board is at the position of the node and is left there.
+    tree -> The TreeStore the node is in, the children are added to it.
+    a -> The point the maximising parent already has, an expecting position that can not get over it is cut (Star1).
+    bounds -> (lower, upper) of the evaluation function (Board.EvaluationBounds), None not to cut any position.
+    A cut expecting position gets the highest point it could have had, its children that were not searched get none.
+    """
+    CheckDeadline()
+
+    points = tree.points
 
     # Get list of available actions
     availableActions = []
     if(isMax):      
-        availableActions = currentBoard.AvailableActionsFox()
+        availableActions = board.AvailableActionsFox()
     else:                
-        availableActions = currentBoard.AvailableActionsSheep()
+        availableActions = board.AvailableActionsSheep()
+    if(depth == 0):
+        availableActions = board.DropMirroredActions(availableActions)
 
     # Check the leave (We are in the last depth or we have no children)
     if(depth == maxDebth or availableActions.__len__() == 0):
-        node.point = currentBoard.EvaluationFunction()
+        points[node] = Entities.evaluationCache.Evaluate(board)
         return node
 
     # Make the children
-    for action in availableActions:
-        child = Entities.MinimaxTreeNode(depth + 1)
-        newActions = node.actions.copy()
-        newActions.append(action)
-        child.actions = newActions
-        child.parent = node
-        node.AddChildren(child)
+    children = tree.AddChildren(node, availableActions)
 
     # Actual minimax with alpha beta pruning code
     if(not isExpect): # Maximum
         v = -math.inf
         childNode = None
-        for child in node.children:
-            temp = Expectimax(board, child, depth +1, maxDebth, not isMax , True)
+        for child, action in zip(children, availableActions):
+            captured = board.Action(action[0], action[1])
+            temp = Expectimax(board, tree, child, depth +1, maxDebth, not isMax , True, max(a, v), bounds)
+            board.ReverseAction(action[0], action[1], captured)
             if(temp == None):
                 continue
-            if(temp.point > v):
+            if(points[temp] > v):
                 childNode = temp
-                v = temp.point
-        node.point = v
+                v = points[temp]
+        points[node] = v
         return childNode
     else: # Expecting
         v = 0
         childNode = None
-        for child in node.children:
-            temp = Expectimax(board, child, depth +1, maxDebth, not isMax ,  False)
+        for i, (child, action) in enumerate(zip(children, availableActions)):
+            childA = ExpectingChildBound(a, v, children.__len__() - i - 1, children.__len__(), bounds)
+            captured = board.Action(action[0], action[1])
+            temp = Expectimax(board, tree, child, depth +1, maxDebth, not isMax ,  False, childA, bounds)
+            board.ReverseAction(action[0], action[1], captured)
             if(temp == None):
                 continue
-            v = v + temp.point
-        node.point = v / node.children.__len__()
+            v = v + points[temp]
+            highest = ExpectingHighest(v, children.__len__() - i - 1, children.__len__(), bounds)
+            if(highest <= a):
+                points[node] = highest
+                return node
+        points[node] = v / children.__len__()
         return node
 
-def Deepimax(board, node, depth, maxDepth, isMax, doa, roa):
+def ExpectimaxLine(board, depth, maxDebth, isMax, isExpect, a = -math.inf, bounds = None):
     """
-    This is the algorithm i made to go as deep as we can while maintaining good decisions.
+    Expectimax without a tree, only the recursion stack is kept.
+    Returns (point, line), line is the principal variation from this position. It ends at an expecting
+    position, as there is no single action taken there. A (point, line) of at most 'a' is only the highest it can be,
+    the positions cut are the same as Expectimax's.
     """
-    if(depth == 0 and node == None):
-        node = Entities.DeepimaxTreeNode(0)
-        node.actions = queue.Queue().queue
+    CheckDeadline()
+
+    # Get list of available actions
+    availableActions = []
+    if(isMax):
+        availableActions = board.AvailableActionsFox()
+    else:
+        availableActions = board.AvailableActionsSheep()
+    if(depth == 0):
+        availableActions = board.DropMirroredActions(availableActions)
+
+    # Check the leave (We are in the last depth or we have no children)
+    if(depth == maxDebth or len(availableActions) == 0):
+        return Entities.evaluationCache.Evaluate(board), ()
+
+    if(not isExpect): # Maximum
+        v = -math.inf
+        best = None
+        for action in availableActions:
+            captured = board.Action(action[0], action[1])
+            temp = ExpectimaxLine(board, depth +1, maxDebth, not isMax, True, max(a, v), bounds)
+            board.ReverseAction(action[0], action[1], captured)
+            if(temp[0] > v):
+                v = temp[0]
+                best = (v, (action,) + temp[1])
+        return best
+    else: # Expecting
+        v = 0
+        for i, action in enumerate(availableActions):
+            childA = ExpectingChildBound(a, v, len(availableActions) - i - 1, len(availableActions), bounds)
+            captured = board.Action(action[0], action[1])
+            v = v + ExpectimaxLine(board, depth +1, maxDebth, not isMax, False, childA, bounds)[0]
+            board.ReverseAction(action[0], action[1], captured)
+            highest = ExpectingHighest(v, len(availableActions) - i - 1, len(availableActions), bounds)
+            if(highest <= a):
+                return highest, ()
+        return v / len(availableActions), ()
+
+def ExpectingHighest(v, remaining, count, bounds):
+    """
+    The highest point an expecting position of count children can get, with v the sum of the ones searched
+    and the remaining ones at the upper bound of the evaluation (Star1). Infinite without bounds.
+    """
+    if(bounds == None):
+        return math.inf
+    return (v + remaining * bounds[1]) / count
 
-    # Creating a new instance of the board
-    currentBoard = Entities.Board()
-    currentBoard.Copy(board)
-    previousActions = node.actions.copy()
+def ExpectingChildBound(a, v, remaining, count, bounds):
+    """
+    The point a child of an expecting position has to get over for the position to get over 'a', with v the sum of the
+    children before it and the remaining ones after it at the upper bound of the evaluation. Its own children are cut by it.
+    """
+    if(bounds == None or a == -math.inf):
+        return -math.inf
+    return a * count - v - remaining * bounds[1]
 
-    # Updating the board
-    for i in range(previousActions.__len__()):
-        action = previousActions.popleft()
-        currentBoard.Action(action[0], action[1])
+def Deepimax(board, node, depth, maxDepth, isMax, doa, roa, keepTree = True, workers = 1, reengage = True, memo = None):
+    """
+    This is the algorithm i made to go as deep as we can while maintaining good decisions.
+    The board is at the position of the node and is left there when returning.
+    keepTree -> Without it, children only link to their parents and are not kept in the tree,
+    so only the nominees and their ancestors stay in memory.
+    workers -> Processes the re-engagements are made in, only the chosen nodes are brought back from them.
+    reengage -> Without it the node is returned with its nominees sorted, before they are re-engaged.
+    memo -> A DeepimaxMemo the re-engagements are taken from and kept in, only without a tree (its nodes are not made again).
+    """
+    CheckDeadline()
+
+    isTop = depth == 0 and node == None
+    if(isTop):
+        node = Entities.DeepimaxTreeNode(0)
 
     # Get list of available actions
     availableActions = []
     if(isMax):      
-        availableActions = currentBoard.AvailableActionsFox()
+        availableActions = board.AvailableActionsFox()
     else:                
-        availableActions = currentBoard.AvailableActionsSheep()
+        availableActions = board.AvailableActionsSheep()
+    if(isTop):
+        availableActions = board.DropMirroredActions(availableActions)
 
     # Check the leave (We are in the last depth or we have no children)
     if(depth == maxDepth or availableActions.__len__() == 0 or(roa == 0 and doa == 0)):
-        node.point = currentBoard.EvaluationFunction()
+        node.point = Entities.evaluationCache.Evaluate(board)
         return node
 
     theNode = None
-    tempChildren = []
-    # Make the children
-    for action in availableActions:
-        child = Entities.DeepimaxTreeNode(node.depth + 1)
-        newActions = node.actions.copy()
-        newActions.append(action)
-        child.actions = newActions
-        if((depth % doa) == 0 and depth != 0):
-            tempChildren.append(child)
-        else:
-            child.parent = node
-            node.AddChildren(child)
 
     # Actual Deepimax Algorithms
     if((depth % doa) == 0 and depth != 0):
-        # Expecting
-        v = 0
-        for child in tempChildren:
-            temp = Deepimax(board, child, maxDepth, maxDepth, isMax, 0, 0)
-            if(temp == None):
-                continue
-            v = v + temp.point
-        node.point = v / tempChildren.__len__()
+        # Expecting, the children are all leaves and only their points are needed, so they are
+        # not kept in the tree and are evaluated in place. They are too few for a batch to pay off.
+        total = 0
+        for action in availableActions:
+            captured = board.Action(action[0], action[1])
+            total += Entities.evaluationCache.Evaluate(board)
+            board.ReverseAction(action[0], action[1], captured)
+        node.point = total / availableActions.__len__()
         return node
     else:
-        for child in node.children:
-            temp = Deepimax(board, child, depth +1, maxDepth, not isMax, doa, roa)
+        # Make the children
+        children = []
+        for action in availableActions:
+            child = Entities.DeepimaxTreeNode(node.depth + 1, action)
+            child.parent = node
+            children.append(child)
+        if(keepTree):
+            node.AddChildren(*children)
+
+        for child in children:
+            action = child.move
+            captured = board.Action(action[0], action[1])
+            temp = Deepimax(board, child, depth +1, maxDepth, not isMax, doa, roa, keepTree)
+            board.ReverseAction(action[0], action[1], captured)
             if(temp == None):
                 continue
             if((depth % doa) == doa -1): # Collective
@@ -404,17 +1276,16 @@ def Deepimax(board, node, depth, maxDepth, isMax, doa, roa):
     if((depth % doa) == 0):
         if(theNode.nominies.__len__() != 0): # We have nominees, so we re engage again
             theNode.nominies = sorted(theNode.nominies, key=lambda x: x.point, reverse = isMax)
+            if(not reengage):
+                return theNode
 
             # Re-engage for 'range of accuracy' times
             results = []
-            theMaxDepth = maxDepth - doa
+            theMaxDepth, currentDoa, currentRoa = ReengageArguments(maxDepth, doa, roa)
 
-            if(doa > 1):
-                doa -= 1
-                
-            currentRoa = roa
-            if(currentRoa > 1):
-                currentRoa -= 1
+            # The re-engagements of the top, and the ones under them, are split over the worker processes
+            if(isTop and workers > 1 and theMaxDepth != 0):
+                return Parallel.DeepimaxReengage(board, theNode, maxDepth, isMax, doa, roa, workers, memo)
 
             for i in range(roa):
                 if(i > theNode.nominies.__len__() - 1):
@@ -424,21 +1295,66 @@ def Deepimax(board, node, depth, maxDepth, isMax, doa, roa):
                 if(theMaxDepth == 0):
                     results.append(theNode.nominies[i])
                 else:
-                    temp = Deepimax(board, theNode.nominies[i], 0, theMaxDepth, not isMax, doa, currentRoa)
+                    # Bringing the board from this node to the nominee and back after the call
+                    nominee = theNode.nominies[i]
+                    path = nominee.GetActions(theNode)
+                    captures = ApplyActions(board, path)
+                    found = None
+                    if(memo != None and not keepTree):
+                        key = (board.zobristKey, theMaxDepth, currentDoa, currentRoa, not isMax)
+                        found = memo.Get(key)
+                    if(found != None):
+                        temp = DeepimaxChain(nominee, Entities.DecodeActions(found[1]), found[0])
+                    else:
+                        temp = Deepimax(board, nominee, 0, theMaxDepth, not isMax, currentDoa, currentRoa, keepTree, memo = memo)
+                        if(memo != None and not keepTree):
+                            memo.Keep(key, temp.point, temp.GetActions(nominee))
+                    ReverseActions(board, path, captures)
                     if(temp != None):
                         results.append(temp)
 
-            result = None
-            if(isMax):
-                result = max(results, key = lambda x: x.point)
-            else:
-                result = min(results, key = lambda x: x.point)
-
-            theNode.point = result.point
-            return result
+            return DeepimaxChoose(theNode, results, isMax)
 
         else:
             return theNode
     else:
         return theNode
 
+def ReengageArguments(maxDepth, doa, roa):
+    """
+    The arguments Deepimax re-engages the nominees of a node with: (maxDepth, doa, roa).
+    Each re-engagement goes 'doa' depths less deep, with one less depth and range of accuracy (down to 1).
+    """
+    if(doa > 1):
+        currentDoa = doa - 1
+    else:
+        currentDoa = doa
+    if(roa > 1):
+        currentRoa = roa - 1
+    else:
+        currentRoa = roa
+    return maxDepth - doa, currentDoa, currentRoa
+
+def DeepimaxChoose(node, results, isMax):
+    """ The best of the nodes the re-engagements of the node chose, the first one of the same points. Its point is the node's """
+    result = None
+    if(isMax):
+        result = max(results, key = lambda x: x.point)
+    else:
+        result = min(results, key = lambda x: x.point)
+
+    node.point = result.point
+    return result
+
+def DeepimaxChain(node, actions, point):
+    """
+    Makes the node a re-engagement of the node chose again, from the actions down to it, and gives both of them the point.
+    Returns the chosen node, as the re-engagement does.
+    """
+    node.point = point
+    for action in actions:
+        child = Entities.DeepimaxTreeNode(node.depth + 1, action)
+        child.parent = node
+        node = child
+    node.point = point
+    return node
@@ -9,7 +9,11 @@ A project at the university of Ashrafi Esfahani.
 """
 
 from enum import IntEnum
-import queue
+from collections import OrderedDict
+from array import array
+import weakref
+import random
+import math
 
 SM = 14             # Separation Multiplier for
 SCountM = 10       # Sheeps Count Multiplier 
@@ -19,6 +23,35 @@ ACM = -10           # Available Captures Multiplier
 
 MaxCountGame = 20
 TurnTime = 60
+SearchWorkers = 1                           # Processes the agents split their searches over, 1 to search in their own one
+AspirationWindow = 10                       # Points on each side of the last point a PVS search starts its window with
+SearchTimeShare = 0.9                       # Share of the turn time a search may take, the rest is for taking the action
+TranspositionMemory = 32 * 1024 * 1024      # Bytes a transposition table may take
+EvaluationCacheSize = 200000                # Positions the evaluation cache keeps
+DeepimaxMemoMemory = 16 * 1024 * 1024       # Bytes the memo of Deepimax's re-engagements may take
+MinimaxNodeBudget = 4000000                 # Nodes a Minimax tree may have
+MinimaxMemoryBudget = 512 * 1024 * 1024     # Bytes a Minimax tree, its frontier and making its next depth may take
+
+# Goes up each time the multipliers change, so anything holding evaluations knows they are stale
+MultipliersVersion = 0
+
+def SetMultipliers(sm, sCountM, adm, amm, acm):
+    """
+    Sets the multipliers of the evaluation function. It is called from the GUI thread while a search may be running,
+    so it only bumps the version, the caches drop their evaluations themselves when they see it.
+    """
+    global SM
+    global SCountM
+    global ADM
+    global AMM
+    global ACM
+    global MultipliersVersion
+    SM = sm
+    SCountM = sCountM
+    ADM = adm
+    AMM = amm
+    ACM = acm
+    MultipliersVersion += 1
 
 class RoomType (IntEnum):
     Disable = 0
@@ -39,176 +72,393 @@ class Strategy(IntEnum):
     MinimaxPAB = 1
     Expectimax = 2
     Deepimax = 3
+    PVS = 4
+
+class Bound(IntEnum):
+    Exact = 0
+    Lower = 1       # The point is at least this much (the search failed high)
+    Upper = 2       # The point is at most this much (the search failed low)
+
+#region Bitboard layout
+# Each playable room of the cross gets an index (0 to 32), row by row, so the
+# board can be kept as integer masks in which bit i stands for the room CELLS[i].
+LAYOUT =  [[0,0,0,0,0,0,0,0,0],
+           [0,0,0,1,1,1,0,0,0],
+           [0,0,0,1,1,1,0,0,0],
+           [0,1,1,1,1,1,1,1,0],
+           [0,1,1,1,1,1,1,1,0],
+           [0,1,1,1,1,1,1,1,0],
+           [0,0,0,1,1,1,0,0,0],
+           [0,0,0,1,1,1,0,0,0],
+           [0,0,0,0,0,0,0,0,0]]
+
+CELLS = [(row, column) for row in range(len(LAYOUT)) for column in range(len(LAYOUT[row])) if LAYOUT[row][column] != RoomType.Disable.value]
+CELL_INDEX = [[-1] * len(LAYOUT[row]) for row in range(len(LAYOUT))]
+for index, (row, column) in enumerate(CELLS):
+    CELL_INDEX[row][column] = index
+PLAYABLE = (1 << len(CELLS)) - 1
+
+START_FOX = (3,4)
+START_SHEEPS = [(5,1),(5,2),(5,3),(5,4),(5,5),(5,6),(5,7),(6,3),(6,4),(6,5),(7,3),(7,4),(7,5)]
+
+# Static adjacency of the board, computed once since the board shape never changes.
+# Rooms with an even (row - column) are connected diagonally as well as straight.
+# NEIGHBORS[i]      -> indices of the rooms connected to room i
+# NEIGHBOR_MASKS[i] -> the same rooms as a mask
+# JUMPS[i]          -> (over, landing) index pairs of the captures a fox on room i can make
+# ROOM_NEIGHBORS    -> NEIGHBORS as positions, indexed by [row][column] (empty for disabled rooms)
+NEIGHBORS = []
+NEIGHBOR_MASKS = []
+JUMPS = []
+ROOM_NEIGHBORS = [[[] for column in range(len(LAYOUT[row]))] for row in range(len(LAYOUT))]
+for row, column in CELLS:
+    directions = [(-1, 0), (0, -1), (0, 1), (1, 0)]
+    if(abs(row - column) % 2 == 0):
+        directions = [(-1, -1), (-1, 1), (1, -1), (1, 1)] + directions
+    neighbors = []
+    jumps = []
+    for dRow, dColumn in directions:
+        over = CELL_INDEX[row + dRow][column + dColumn]
+        if(over < 0):
+            continue
+        neighbors.append(over)
+        landing = CELL_INDEX[row + 2 * dRow][column + 2 * dColumn]
+        if(landing >= 0):
+            jumps.append((over, landing))
+    NEIGHBORS.append(tuple(neighbors))
+    NEIGHBOR_MASKS.append(sum(1 << n for n in neighbors))
+    JUMPS.append(tuple(jumps))
+    ROOM_NEIGHBORS[row][column] = [CELLS[n] for n in neighbors]
+
+MAX_NEIGHBORS = max(len(neighbors) for neighbors in NEIGHBORS)
+MAX_JUMPS = max(len(jumps) for jumps in JUMPS)
+
+# MIRROR[i] -> the room on the other side of the vertical axis, the board is symmetric about it
+MIRROR = [CELL_INDEX[row][len(LAYOUT[row]) -1 - column] for row, column in CELLS]
+
+# DISTANCES[i][j] -> manhattan distance between rooms i and j
+DISTANCES = [[abs(r1 - r2) + abs(c1 - c2) for r2, c2 in CELLS] for r1, c1 in CELLS]
+MAX_DISTANCE = max(max(distances) for distances in DISTANCES)
+
+def PositionsToMask(positions):
+    """ Returns the mask having the bits of the given positions set """
+    mask = 0
+    for position in positions:
+        mask |= 1 << CELL_INDEX[position[0]][position[1]]
+    return mask
+
+def MaskIndices(mask):
+    """ Yields the room index of every set bit of the mask, from the lowest one """
+    while(mask):
+        lowest = mask & -mask
+        yield lowest.bit_length() - 1
+        mask ^= lowest
+
+def PopCount(mask):
+    """ Number of set bits (rooms) in the mask """
+    return bin(mask).count("1")
+#endregion
+
+#region Zobrist keys
+# A random 64 bit number for a sheep or the fox on each room, and one for the sheeps being the side to move.
+# The key of a position is the xor of the numbers of what is on the board, so taking an action
+# changes it by a few xors. The generator is seeded, so every process gets the same keys.
+ZOBRIST_RANDOM = random.Random(20160950264)
+ZOBRIST_SHEEP = [ZOBRIST_RANDOM.getrandbits(64) for i in range(len(CELLS))]
+ZOBRIST_FOX = [ZOBRIST_RANDOM.getrandbits(64) for i in range(len(CELLS))]
+ZOBRIST_SHEEPS_TURN = ZOBRIST_RANDOM.getrandbits(64)
+
+# The numbers of the mirrored rooms. Xoring them gives the key of the mirrored position (mirrorKey),
+# the smaller one of the two keys is the key both mirrored positions share (CanonicalKey)
+ZOBRIST_MIRROR_SHEEP = [ZOBRIST_SHEEP[MIRROR[i]] for i in range(len(CELLS))]
+ZOBRIST_MIRROR_FOX = [ZOBRIST_FOX[MIRROR[i]] for i in range(len(CELLS))]
+#endregion
+
+def MirrorMask(mask):
+    """ The mask mirrored about the vertical axis """
+    mirrored = 0
+    for i in MaskIndices(mask):
+        mirrored |= 1 << MIRROR[i]
+    return mirrored
+
+def MirrorAction(action):
+    """ The action mirrored about the vertical axis """
+    start, end = action
+    return (CELLS[MIRROR[CELL_INDEX[start[0]][start[1]]]], CELLS[MIRROR[CELL_INDEX[end[0]][end[1]]]])
 
 # Class of the board, containing the first initialization of board.
-# And necessary functions to do on the board
+# And necessary functions to do on the board.
+# The board itself is kept as bitmasks over the playable rooms (sheepMask and foxIndex),
+# 'fox', 'sheeps' and 'rooms' are only views over those masks.
+# The sums the evaluation function needs (distanceSum, sheepsFreedom and foxMoves) are
+# kept up to date by every action, so evaluating a position does not walk the sheeps.
 class Board:
+    __slots__ = ('foxIndex', 'sheepMask', 'sheepsCount', 'sheepsMax', 'turn', 'zobristKey', 'mirrorKey',
+                 'distanceSum', 'sheepsFreedom', 'foxMoves')
+    SNAPSHOTBYTES = 240     # Rough size of a Snapshot in memory (the tuple and its numbers)
+
     # Initialize properties
     def __init__(self):
-        self.fox = (3,4)
-        self.sheeps = [(5,1),(5,2),(5,3),(5,4),(5,5),(5,6),(5,7),(6,3),(6,4),(6,5),(7,3),(7,4),(7,5)]
+        self.foxIndex = CELL_INDEX[START_FOX[0]][START_FOX[1]]
+        self.sheepMask = PositionsToMask(START_SHEEPS)
+        self.sheepsCount = len(START_SHEEPS)
         self.sheepsMax = 13
-        self.rooms =   [[0,0,0,0,0,0,0,0,0],
-                        [0,0,0,1,1,1,0,0,0],
-                        [0,0,0,1,1,1,0,0,0],
-                        [0,1,1,1,3,1,1,1,0],
-                        [0,1,1,1,1,1,1,1,0],
-                        [0,2,2,2,2,2,2,2,0],
-                        [0,0,0,2,2,2,0,0,0],
-                        [0,0,0,2,2,2,0,0,0],
-                        [0,0,0,0,0,0,0,0,0]]
+        self.turn = Turn.Fox
+        self.zobristKey = 0
+        self.mirrorKey = 0
+        self.HeavyUpdate()
 
     def Copy(self, board):
-        self.fox = board.fox
-        self.sheeps.clear()
-        for x in board.sheeps:
-            self.sheeps.append(x)
-        for r in range(len(board.rooms)):
-            for c in range(len(board.rooms[r])):
-                self.rooms[r][c] = board.rooms[r][c]
+        self.foxIndex = board.foxIndex
+        self.sheepMask = board.sheepMask
+        self.sheepsCount = board.sheepsCount
         self.sheepsMax = board.sheepsMax
+        self.turn = board.turn
+        self.zobristKey = board.zobristKey
+        self.mirrorKey = board.mirrorKey
+        self.distanceSum = board.distanceSum
+        self.sheepsFreedom = board.sheepsFreedom
+        self.foxMoves = board.foxMoves
 
-    # Updates the Fox and Sheeps property
-    def HeavyUpdate(self):
-        self.sheeps = []
-        for row in range(len(self.rooms) -2):
-            for column in range(len(self.rooms[row +1]) -2):
-                if(rooms[row +1][column +1] == 3):
-                    self.fox = (row +1, column +1)
-                if(rooms[row +1][column +1] == 2):
-                    self.sheeps.append((row +1,column +1))
-
-    # Get only diagonally neighbors of a room
-    def __GetDiagonolyRooms(self, row, column):
-        return [(row -1, column -1), (row -1, column +1),
-                (row +1, column -1), (row +1, column +1)]
-
-    # Get only straight neighbors of a room
-    def __GetStraightRooms(self, row, column):
-        return [(row -1, column),
-                (row, column -1), (row, column +1),
-                (row +1, column)]
+    # A light weight record of the board that Restore brings back, used to come back to a position
+    # without replaying the actions that led to it
+    def Snapshot(self):
+        return (self.foxIndex, self.sheepMask, self.sheepsCount, self.turn, self.zobristKey, self.mirrorKey,
+                self.distanceSum, self.sheepsFreedom, self.foxMoves)
 
-    # Gets the neighbors of a room
-    def Neighbors(self, row, column):
-        neighbors = []
-        output = []
-        if((row == 0) or (row == 8) or (column == 0) or (column == 8)):
-            neighbors = []
-        elif(abs((row - column)) % 2 == 0):
-            neighbors = self.__GetDiagonolyRooms(row,column) + self.__GetStraightRooms(row,column)
-        else:
-            neighbors = self.__GetStraightRooms(row,column) 
+    def Restore(self, snapshot):
+        (self.foxIndex, self.sheepMask, self.sheepsCount, self.turn, self.zobristKey, self.mirrorKey,
+            self.distanceSum, self.sheepsFreedom, self.foxMoves) = snapshot
+
+    # Sets the side to move, Action and ReverseAction keep it up to date from then on
+    def SetTurn(self, turn):
+        if(turn != self.turn):
+            self.turn = turn
+            self.zobristKey ^= ZOBRIST_SHEEPS_TURN
+            self.mirrorKey ^= ZOBRIST_SHEEPS_TURN
+
+    # The key this position shares with its mirror
+    def CanonicalKey(self):
+        return min(self.zobristKey, self.mirrorKey)
+
+    # True when the board is kept under the mirrored key, actions found for it have to be mirrored
+    def IsMirrored(self):
+        return self.mirrorKey < self.zobristKey
 
-        for room in neighbors:
-            if(self.rooms[room[0]][room[1]] != RoomType.Disable.value):
-                output.append(room)
+    # True when the position is its own mirror
+    def IsSymmetric(self):
+        return MIRROR[self.foxIndex] == self.foxIndex and MirrorMask(self.sheepMask) == self.sheepMask
 
+    # Leaves out the mirror of each action when the position is symmetric, as both lead to the same position mirrored
+    def DropMirroredActions(self, actions):
+        if(not self.IsSymmetric()):
+            return actions
+        output = []
+        for action in actions:
+            if(MirrorAction(action) not in output):
+                output.append(action)
         return output
 
+    #region List views
+    @property
+    def fox(self):
+        return CELLS[self.foxIndex]
+
+    @fox.setter
+    def fox(self, position):
+        self.foxIndex = CELL_INDEX[position[0]][position[1]]
+        self.HeavyUpdate()
+
+    @property
+    def sheeps(self):
+        return [CELLS[i] for i in MaskIndices(self.sheepMask)]
+
+    @property
+    def rooms(self):
+        rooms = [row[:] for row in LAYOUT]
+        for i in MaskIndices(self.sheepMask):
+            rooms[CELLS[i][0]][CELLS[i][1]] = RoomType.Sheep.value
+        rooms[CELLS[self.foxIndex][0]][CELLS[self.foxIndex][1]] = RoomType.Fox.value
+        return rooms
+    #endregion
+
+    # Mask of the rooms that are neither taken by the fox nor by a sheep
+    def EmptyMask(self):
+        return PLAYABLE & ~(self.sheepMask | (1 << self.foxIndex))
+
+    # Updates the properties that are derived from the masks, from scratch
+    def HeavyUpdate(self):
+        self.sheepsCount = PopCount(self.sheepMask)
+        self.zobristKey = ZOBRIST_FOX[self.foxIndex]
+        self.mirrorKey = ZOBRIST_MIRROR_FOX[self.foxIndex]
+        for sheep in MaskIndices(self.sheepMask):
+            self.zobristKey ^= ZOBRIST_SHEEP[sheep]
+            self.mirrorKey ^= ZOBRIST_MIRROR_SHEEP[sheep]
+        if(self.turn == Turn.Sheeps):
+            self.zobristKey ^= ZOBRIST_SHEEPS_TURN
+            self.mirrorKey ^= ZOBRIST_SHEEPS_TURN
+
+        empty = self.EmptyMask()
+        self.distanceSum = 0
+        self.sheepsFreedom = 0
+        for sheep in MaskIndices(self.sheepMask):
+            self.distanceSum += DISTANCES[self.foxIndex][sheep]
+            self.sheepsFreedom += PopCount(NEIGHBOR_MASKS[sheep] & empty)
+        self.foxMoves = PopCount(NEIGHBOR_MASKS[self.foxIndex] & empty)
+
+    # Gets the neighbors of a room
+    def Neighbors(self, row, column):
+        return ROOM_NEIGHBORS[row][column]
+
+    # Takes the action on the board. Returns the index of the captured sheep room, if the fox captured one.
+    # That index is all ReverseAction needs to take the action back.
     def Action(self, start, end):
-        if(self.rooms[end[0]][end[1]] != RoomType.Empty.value):
+        startIndex = CELL_INDEX[start[0]][start[1]]
+        endIndex = CELL_INDEX[end[0]][end[1]]
+        if(endIndex < 0 or not (self.EmptyMask() >> endIndex) & 1):
             return
 
-        if(self.rooms[start[0]][start[1]] == RoomType.Sheep.value):
-            self.sheeps.remove(start)
-            self.sheeps.append(end)
+        if((self.sheepMask >> startIndex) & 1):
+            self.__SheepLeaves(startIndex)
+            self.__SheepEnters(endIndex)
+            self.SetTurn(Turn.Fox)
 
-        if(self.rooms[start[0]][start[1]] == RoomType.Fox.value):
-            self.fox = end
+        elif(startIndex == self.foxIndex):
+            self.__FoxMoves(endIndex)
+            self.SetTurn(Turn.Sheeps)
             if(abs(end[0] - start[0]) == 2 or abs(end[1] - start[1]) == 2):
-                possibleSheep = (int((end[0] + start[0])/2) , int((end[1] + start[1])/2))
-                if(self.rooms[possibleSheep[0]][possibleSheep[1]] == RoomType.Sheep.value):
+                possibleSheep = CELL_INDEX[(end[0] + start[0]) // 2][(end[1] + start[1]) // 2]
+                if((self.sheepMask >> possibleSheep) & 1):
                     # Its a capture
-                    self.rooms[possibleSheep[0]][possibleSheep[1]] = RoomType.Empty.value
-                    self.sheeps.remove(possibleSheep)
-
-        # Updating the board
-        self.rooms[end[0]][end[1]] = self.rooms[start[0]][start[1]]
-        self.rooms[start[0]][start[1]] = RoomType.Empty.value
+                    self.__SheepLeaves(possibleSheep)
+                    return possibleSheep
 
-    def ReverseAction(self, start, end):
-        if(self.rooms[start[0]][start[1]] != RoomType.Empty.value):
+    # Takes back an action taken by Action, captured is what Action returned for it.
+    def ReverseAction(self, start, end, captured = None):
+        startIndex = CELL_INDEX[start[0]][start[1]]
+        endIndex = CELL_INDEX[end[0]][end[1]]
+        if(startIndex < 0 or not (self.EmptyMask() >> startIndex) & 1):
             return
 
-        if(self.rooms[end[0]][end[1]] == RoomType.Sheep.value):
-            self.sheeps.remove(end)
-            self.sheeps.append(start)
+        if((self.sheepMask >> endIndex) & 1):
+            self.__SheepLeaves(endIndex)
+            self.__SheepEnters(startIndex)
+            self.SetTurn(Turn.Sheeps)
 
-        if(self.rooms[end[0]][end[1]] == RoomType.Fox.value):
-            self.fox = start
+        elif(endIndex == self.foxIndex):
+            if(captured != None):
+                # It was a capture, Redo the capture by bringing the sheep back
+                self.__SheepEnters(captured)
+            self.__FoxMoves(startIndex)
+            self.SetTurn(Turn.Fox)
 
-            if(abs(end[0] - start[0]) == 2 or abs(end[1] - start[1]) == 2):
-                # It was a capture, Redo the capture by bringing a sheep inside
-                previousSheep = ((end[0] + start[0])/2, (end[1] + start[1])/2)
-                self.rooms[previousSheep[0]][previousSheep[1]] = RoomType.Sheep.value
-                self.sheeps.append(previousSheep)
+    #region Incremental updates, each one changes a single room and keeps the sums in line
+    # The sheep on the room goes away, the room becomes empty
+    def __SheepLeaves(self, index):
+        self.sheepMask ^= 1 << index
+        self.sheepsCount -= 1
+        self.zobristKey ^= ZOBRIST_SHEEP[index]
+        self.mirrorKey ^= ZOBRIST_MIRROR_SHEEP[index]
+        self.distanceSum -= DISTANCES[self.foxIndex][index]
+        # The sheep takes its empty neighbors with it, and its sheep neighbors get the room as an empty neighbor
+        self.sheepsFreedom += PopCount(NEIGHBOR_MASKS[index] & self.sheepMask) - PopCount(NEIGHBOR_MASKS[index] & self.EmptyMask())
+        if((NEIGHBOR_MASKS[self.foxIndex] >> index) & 1):
+            self.foxMoves += 1
+
+    # A sheep comes to the empty room
+    def __SheepEnters(self, index):
+        self.sheepMask |= 1 << index
+        self.sheepsCount += 1
+        self.zobristKey ^= ZOBRIST_SHEEP[index]
+        self.mirrorKey ^= ZOBRIST_MIRROR_SHEEP[index]
+        self.distanceSum += DISTANCES[self.foxIndex][index]
+        self.sheepsFreedom += PopCount(NEIGHBOR_MASKS[index] & self.EmptyMask()) - PopCount(NEIGHBOR_MASKS[index] & self.sheepMask)
+        if((NEIGHBOR_MASKS[self.foxIndex] >> index) & 1):
+            self.foxMoves -= 1
 
-        # Updating the board
-        self.rooms[start[0]][start[1]] = self.rooms[end[0]][end[1]]
-        self.rooms[end[0]][end[1]] = RoomType.Empty.value
+    # The fox goes to the empty room
+    def __FoxMoves(self, index):
+        previous = self.foxIndex
+        self.foxIndex = index
+        self.zobristKey ^= ZOBRIST_FOX[previous] ^ ZOBRIST_FOX[index]
+        self.mirrorKey ^= ZOBRIST_MIRROR_FOX[previous] ^ ZOBRIST_MIRROR_FOX[index]
+        # The sheeps around the room left become freer and the ones around the new room less
+        self.sheepsFreedom += PopCount(NEIGHBOR_MASKS[previous] & self.sheepMask) - PopCount(NEIGHBOR_MASKS[index] & self.sheepMask)
+        self.foxMoves = PopCount(NEIGHBOR_MASKS[index] & self.EmptyMask())
+        distances = DISTANCES[index]
+        self.distanceSum = 0
+        for sheep in MaskIndices(self.sheepMask):
+            self.distanceSum += distances[sheep]
+    #endregion
 
     def AvailableActionsFox(self):
         actions = []
-        neighbors = self.Neighbors(self.fox[0], self.fox[1])
-        for n in neighbors:
-            if(self.rooms[n[0]][n[1]] == RoomType.Empty.value):
-                actions.append((self.fox, n))
-            elif (self.IsCapturable(n)):
-                actions.append((self.fox, self.__GetCapturableRoom(n)))
+        fox = self.fox
+        empty = self.EmptyMask()
+        for n in NEIGHBORS[self.foxIndex]:
+            if((empty >> n) & 1):
+                actions.append((fox, CELLS[n]))
+        for over, landing in JUMPS[self.foxIndex]:
+            if((self.sheepMask >> over) & 1 and (empty >> landing) & 1):
+                actions.append((fox, CELLS[landing]))
         return actions
 
     def AvailableActionsSheep(self):
         actions = []
-        for sheep in self.sheeps:
-            neighbors = self.Neighbors(sheep[0], sheep[1])
-            for n in neighbors:
-                if(self.rooms[n[0]][n[1]] == RoomType.Empty.value):
-                    actions.append((sheep, n))
+        empty = self.EmptyMask()
+        for sheep in MaskIndices(self.sheepMask):
+            for n in NEIGHBORS[sheep]:
+                if((empty >> n) & 1):
+                    actions.append((CELLS[sheep], CELLS[n]))
         return actions
 
-    def __GetCapturableRoom(self, room):
-        if(self.IsCapturable(room)):
-            return (room[0] + (room[0] - self.fox[0]), room[1] + (room[1] - self.fox[1]))
+    # The fox's actions that capture a sheep
+    def AvailableCapturesFox(self):
+        actions = []
+        fox = self.fox
+        empty = self.EmptyMask()
+        for over, landing in JUMPS[self.foxIndex]:
+            if((self.sheepMask >> over) & 1 and (empty >> landing) & 1):
+                actions.append((fox, CELLS[landing]))
+        return actions
+
+    # The sheeps' actions into the rooms the fox lands on when capturing, each of them blocks a capture
+    def CaptureBlocksSheep(self):
+        empty = self.EmptyMask()
+        landings = 0
+        for over, landing in JUMPS[self.foxIndex]:
+            if((self.sheepMask >> over) & 1 and (empty >> landing) & 1):
+                landings |= 1 << landing
+        actions = []
+        for sheep in MaskIndices(self.sheepMask):
+            for n in NEIGHBORS[sheep]:
+                if((landings >> n) & 1):
+                    actions.append((CELLS[sheep], CELLS[n]))
+        return actions
 
     def AvailableMoveCount(self):
-        count = 0
-        neighbors = self.Neighbors(self.fox[0], self.fox[1])
-        for n in neighbors:
-            if(self.rooms[n[0]][n[1]] == RoomType.Empty.value):
-                count += 1
-        return count
+        return self.foxMoves
 
     def AvailableCaptureCount(self):
         count = 0
-        neighbors = self.Neighbors(self.fox[0], self.fox[1])
-        for n in neighbors:
-            if(self.IsCapturable(n)):
-                    count += 1
+        empty = self.EmptyMask()
+        for over, landing in JUMPS[self.foxIndex]:
+            if((self.sheepMask >> over) & 1 and (empty >> landing) & 1):
+                count += 1
         return count
 
     def IsCapturable(self, room):
-        if(self.rooms[room[0]][room[1]] == RoomType.Sheep.value):
-                if(self.rooms[room[0] + (room[0] - self.fox[0])][room[1] + (room[1] - self.fox[1])] == RoomType.Empty.value):
-                    return True
+        over = CELL_INDEX[room[0]][room[1]]
+        for jumpOver, landing in JUMPS[self.foxIndex]:
+            if(jumpOver == over):
+                return bool((self.sheepMask >> over) & 1 and (self.EmptyMask() >> landing) & 1)
+        return False
 
     def AverageFoxSheepDistance(self):
-        count = 0
-        totalDistance = 0
-        for s in self.sheeps:
-            count += 1
-            totalDistance += abs(s[0] - self.fox[0]) + abs(s[1] - self.fox[1])
-
-        return int(totalDistance / count)
+        return int(self.distanceSum / self.sheepsCount)
 
     def SheepsSeperation(self):
-        totalAdjacentEmptyRooms = 0
-        for sheep in self.sheeps:
-            neighbors = self.Neighbors(sheep[0], sheep[1])
-            for n in neighbors:
-                if(self.rooms[n[0]][n[1]] == RoomType.Empty.value):
-                    totalAdjacentEmptyRooms += 1
-        return int(totalAdjacentEmptyRooms / len(self.sheeps))
+        return int(self.sheepsFreedom / self.sheepsCount)
 
     def EvaluationFunction(self):
         global SCountM
@@ -217,20 +467,318 @@ class Board:
         global ADM
         global SM
 
-        if(len(self.sheeps) == 0):
+        count = self.sheepsCount
+        if(count == 0):
+            return 0
+
+        # Every term but the captures is kept by the actions, so this costs the same at any position
+        return int((self.sheepsMax / count)) * SCountM + self.foxMoves * AMM + self.AvailableCaptureCount() * ACM + int(self.sheepsFreedom / count) * SM + int(self.distanceSum / count) * ADM
+
+    # The lowest and highest points EvaluationFunction can give at this position or any after it, for any signs of the
+    # multipliers. The sheeps only get fewer, the fox's moves and captures are at most its neighbors together.
+    def EvaluationBounds(self):
+        count = (int(self.sheepsMax / max(self.sheepsCount, 1)) * SCountM, self.sheepsMax * SCountM)
+        fox = [moves * AMM + captures * ACM for moves in range(MAX_NEIGHBORS + 1) for captures in range(min(MAX_JUMPS, MAX_NEIGHBORS - moves) + 1)]
+        freedom = (0, MAX_NEIGHBORS * SM)
+        distance = (0, MAX_DISTANCE * ADM)
+        lower = min(count) + min(fox) + min(freedom) + min(distance)
+        upper = max(count) + max(fox) + max(freedom) + max(distance)
+        # No sheeps left is worth 0
+        return min(lower, 0), max(upper, 0)
+
+# A fixed size table of searched positions, keyed by their canonical key (see Board.CanonicalKey).
+# Each bucket has two slots, the first one keeps the deepest search done of a position and
+# the second one is always replaced, so fresh positions still get in when the first one is taken.
+class TranspositionTable:
+    ENTRYBYTES = 200        # Rough size of one entry in memory (the slot, the tuple and its numbers)
+
+    def __init__(self, memory = None):
+        if(memory == None):
+            memory = TranspositionMemory
+        self.bucketsCount = max(1, memory // (2 * TranspositionTable.ENTRYBYTES))
+        self.slots = [None] * (2 * self.bucketsCount)
+        self.multipliersVersion = MultipliersVersion
+        self.ResetCounters()
+
+    def ResetCounters(self):
+        self.probes = 0
+        self.hits = 0
+        self.stores = 0
+        self.collisions = 0     # Stores that pushed out another position
+
+    def Clear(self):
+        self.slots = [None] * (2 * self.bucketsCount)
+        self.multipliersVersion = MultipliersVersion
+
+    # Returns the entry (key, depth, point, bound, action) of the position, or None
+    def Probe(self, key):
+        self.probes += 1
+        slot = 2 * (key % self.bucketsCount)
+        entry = self.slots[slot]
+        if(entry == None or entry[0] != key):
+            entry = self.slots[slot +1]
+            if(entry == None or entry[0] != key):
+                return None
+        self.hits += 1
+        return entry
+
+    # Keeps the search result of a position, depth is how deep it was searched from there
+    def Store(self, key, depth, point, bound, action):
+        self.stores += 1
+        slot = 2 * (key % self.bucketsCount)
+        entry = self.slots[slot]
+        if(entry != None and entry[0] != key and entry[1] > depth):
+            # The deeper search stays, this one goes to the always replace slot
+            slot += 1
+            entry = self.slots[slot]
+        if(entry != None and entry[0] != key):
+            self.collisions += 1
+        self.slots[slot] = (key, depth, point, bound, action)
+
+# A TranspositionTable in a shared memory block, which processes searching at the same time use together (Lazy SMP).
+# Each entry is two 64 bit words, the key xor'ed with the data and the data: the point, depth, bound and action packed
+# in one number. There is no lock, an entry written by two processes at once does not check against its key and is a miss.
+class SharedTranspositionTable:
+    ENTRYBYTES = 16
+    POINTOFFSET = 1 << 31   # Points are kept in 32 bits, the evaluation's whole numbers are far smaller
+    MAXDEPTH = 255
+    USED = 1 << 63          # Set in the data of every entry, an empty slot is all zeros
+
+    # memory -> Bytes of the block to make, name -> the name of a block another process made, to use it
+    def __init__(self, memory = None, name = None):
+        # Only here, shared memory needs Python 3.8 and the rest of the game runs without it
+        from multiprocessing import shared_memory as SharedMemory
+        if(name == None):
+            if(memory == None):
+                memory = TranspositionMemory
+            self.bucketsCount = max(1, memory // (2 * SharedTranspositionTable.ENTRYBYTES))
+            self.memory = SharedMemory.SharedMemory(create = True, size = 2 * self.bucketsCount * SharedTranspositionTable.ENTRYBYTES)
+        else:
+            self.memory = SharedMemory.SharedMemory(name = name)
+            self.bucketsCount = self.memory.size // (2 * SharedTranspositionTable.ENTRYBYTES)
+        self.name = self.memory.name
+        self.words = self.memory.buf.cast('Q')
+        # The maker removes the block when the table is gone, the others only let go of it
+        self.finalizer = weakref.finalize(self, SharedTranspositionTable.Release, self.words, self.memory, name == None)
+        self.multipliersVersion = MultipliersVersion
+        self.ResetCounters()
+
+    @staticmethod
+    def Release(words, memory, unlink):
+        words.release()
+        memory.close()
+        if(unlink):
+            memory.unlink()
+
+    def Close(self):
+        self.finalizer()
+
+    def ResetCounters(self):
+        self.probes = 0
+        self.hits = 0
+        self.stores = 0
+        self.collisions = 0
+
+    def Clear(self):
+        self.memory.buf[:] = bytes(self.memory.size)
+        self.multipliersVersion = MultipliersVersion
+
+    # Returns the entry (key, depth, point, bound, action) of the position, or None
+    def Probe(self, key):
+        self.probes += 1
+        word = 4 * (key % self.bucketsCount)
+        data = self.words[word +1]
+        if(self.words[word] ^ data != key):
+            data = self.words[word +3]
+            if(self.words[word +2] ^ data != key):
+                return None
+        self.hits += 1
+        move = (data >> 42) & 0x7FF
+        return (key, (data >> 32) & 0xFF, (data & 0xFFFFFFFF) - SharedTranspositionTable.POINTOFFSET,
+                Bound((data >> 40) & 0x3), None if move == 0 else DecodeMove(move -1))
+
+    # Keeps the search result of a position, depth is how deep it was searched from there
+    def Store(self, key, depth, point, bound, action):
+        self.stores += 1
+        word = 4 * (key % self.bucketsCount)
+        data = self.words[word +1]
+        if(data != 0 and self.words[word] ^ data != key and (data >> 32) & 0xFF > depth):
+            # The deeper search stays, this one goes to the always replace slot
+            word += 2
+            data = self.words[word +1]
+        if(data != 0 and self.words[word] ^ data != key):
+            self.collisions += 1
+        move = 0 if action == None else EncodeMove(action) +1
+        data = (SharedTranspositionTable.USED | move << 42 | int(bound) << 40 | min(depth, SharedTranspositionTable.MAXDEPTH) << 32 |
+                (int(point) + SharedTranspositionTable.POINTOFFSET))
+        self.words[word] = key ^ data
+        self.words[word +1] = data
+
+# Killer actions and history points of an alpha beta search, kept for the whole game to order the actions with.
+# The transposition table's action goes first, then the rest by their history. Captures and then the killers of the depth
+# only break the ties: a single capture barely moves the evaluation, and an action that cut one position seldom cuts
+# its neighbours here, both searched more nodes when they went first.
+class MoveOrdering:
+    KILLERS = 2             # Killer actions kept per depth
+
+    # seed -> With a seed the history starts with a few random points, so searches of the same position
+    # (the helpers of a Lazy SMP search) go over its actions in other orders
+    def __init__(self, seed = None):
+        self.killers = []
+        # Points of each (start, end) action of each side, the fox's and the sheeps'
+        self.history = ([0] * (len(CELLS) * len(CELLS)), [0] * (len(CELLS) * len(CELLS)))
+        if(seed != None):
+            generator = random.Random(seed)
+            for history in self.history:
+                for i in range(len(history)):
+                    history[i] = generator.randrange(4)
+
+    # Halves the history, so the points of the next search weigh more than the ones of the searches before it
+    def Age(self):
+        for history in self.history:
+            for i in range(len(history)):
+                history[i] >>= 1
+
+    # The actions of a position at the depth in the order to search them, tableAction is the one the table has
+    def Order(self, actions, depth, tableAction, isFox):
+        killers = self.killers[depth] if depth < len(self.killers) else ()
+        history = self.history[0 if isFox else 1]
+        return sorted(actions, reverse = True, key = lambda action: (
+            action == tableAction,
+            history[EncodeMove(action)],
+            # Only the fox jumps two rooms, which is a capture
+            abs(action[0][0] - action[1][0]) == 2 or abs(action[0][1] - action[1][1]) == 2,
+            action in killers))
+
+    # Keeps the action that cut the search of a position at the depth, which had 'remaining' depths under it
+    def Cut(self, action, depth, remaining, isFox):
+        while(len(self.killers) <= depth):
+            self.killers.append([])
+        killers = self.killers[depth]
+        if(action not in killers):
+            killers.insert(0, action)
+            del killers[MoveOrdering.KILLERS:]
+        self.history[0 if isFox else 1][EncodeMove(action)] += remaining * remaining
+
+# Keeps the evaluation of the latest positions, keyed by their canonical key (the side to move left out),
+# the least recently used one goes when it is full. It is dropped when the multipliers change.
+class EvaluationCache:
+    def __init__(self, size = None):
+        if(size == None):
+            size = EvaluationCacheSize
+        self.size = size
+        self.points = OrderedDict()
+        self.multipliersVersion = MultipliersVersion
+        self.ResetCounters()
+
+    def ResetCounters(self):
+        self.hits = 0
+        self.misses = 0
+
+    def Clear(self):
+        self.points.clear()
+        self.multipliersVersion = MultipliersVersion
+
+    def HitRate(self):
+        if(self.hits + self.misses == 0):
             return 0
+        return self.hits / (self.hits + self.misses)
+
+    # The evaluation function of the board, from the cache when it is there
+    def Evaluate(self, board):
+        if(self.multipliersVersion != MultipliersVersion):
+            self.Clear()
+
+        key = board.CanonicalKey()
+        if(board.turn == Turn.Sheeps):
+            key = min(board.zobristKey ^ ZOBRIST_SHEEPS_TURN, board.mirrorKey ^ ZOBRIST_SHEEPS_TURN)
 
-        return int((self.sheepsMax / len(self.sheeps))) * SCountM + self.AvailableMoveCount() * AMM + self.AvailableCaptureCount() * ACM + self.SheepsSeperation() * SM + self.AverageFoxSheepDistance() * ADM
+        # Taken out and put back at the end, the most recently used, in one step each
+        point = self.points.pop(key, None)
+        if(point != None):
+            self.hits += 1
+            self.points[key] = point
+            return point
 
+        self.misses += 1
+        point = board.EvaluationFunction()
+        self.points[key] = point
+        if(len(self.points) > self.size):
+            self.points.popitem(last = False)
+        return point
+
+evaluationCache = EvaluationCache()
+
+# Keeps what the re-engagements of Deepimax found: the point and the actions down to the node they chose, keyed by
+# the position (its zobrist key, the side to move is in it), the depths left, doa, roa and the side it maximises for.
+# A re-engagement with the same key searches the same nodes, so it is not searched again. The least recently used one
+# goes when it takes more than its memory. It is dropped when the multipliers change.
+class DeepimaxMemo:
+    ENTRYBYTES = 320        # Rough size of one entry in memory (the slot, the key, the point and the actions)
+
+    def __init__(self, memory = None):
+        if(memory == None):
+            memory = DeepimaxMemoMemory
+        self.size = max(1, memory // DeepimaxMemo.ENTRYBYTES)
+        self.results = OrderedDict()
+        self.multipliersVersion = MultipliersVersion
+        self.ResetCounters()
+
+    def ResetCounters(self):
+        self.hits = 0
+        self.misses = 0
+
+    def Clear(self):
+        self.results.clear()
+        self.multipliersVersion = MultipliersVersion
+
+    def HitRate(self):
+        if(self.hits + self.misses == 0):
+            return 0
+        return self.hits / (self.hits + self.misses)
+
+    # Returns (point, encoded actions) of the re-engagement, or None
+    def Get(self, key):
+        if(self.multipliersVersion != MultipliersVersion):
+            self.Clear()
+
+        result = self.results.get(key)
+        if(result == None):
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.results.move_to_end(key)
+        return result
+
+    # actions -> Down to the node the re-engagement chose, from its own node
+    def Keep(self, key, point, actions):
+        self.results[key] = (point, EncodeActions(actions))
+        if(len(self.results) > self.size):
+            self.results.popitem(last = False)
+
+# The tree nodes are slotted, a search keeps hundreds of thousands of them.
 class TreeNode:
+    __slots__ = ('depth', 'parent', 'children', 'levels')
+
     def __init__(self, depth):
         self.depth = depth
         self.parent = None
-        self.children = []
+        self.children = ()      # Most nodes are leaves, the list is made for the first child
+        self.levels = None      # The nodes of the tree by depth, shared by all its nodes and made for the first child of the top
 
     def AddChildren(self, *args):
+        if(len(self.children) == 0):
+            self.children = []
+        if(self.levels == None):
+            self.levels = [[self]]
+        levels = self.levels
         for x in args:
             self.children.append(x)
+            x.levels = levels
+            level = x.depth - levels[0][0].depth
+            while(len(levels) <= level):
+                levels.append([])
+            levels[level].append(x)
     
     def GetParent(self):
         return self.parent
@@ -238,29 +786,35 @@ class TreeNode:
     def GetChildren(self):
         return self.children
 
+    # The leaves under this node, from left to right
     def GetLeaves(self):
-        if(len(self.children) != 0):
-            leaves = []
-            for x in self.children:
-                leaves += x.GetLeaves()
-            return leaves
-        return [self]
+        nodes = [self]
+        while(len(nodes) != 0):
+            node = nodes.pop()
+            if(len(node.children) == 0):
+                yield node
+            else:
+                nodes.extend(reversed(node.children))
 
     def GetTop(self):
-        if(self.parent != None):
-            return self.parent.GetTop()
-        return self
+        node = self
+        while(node.parent != None):
+            node = node.parent
+        return node
 
+    # The nodes that are depth levels under this node. From the top they come straight from the level index,
+    # in the order they were added, where the children of a node are together.
     def GetDepthNodes(self, depth):
-        if(depth == 0):
-            return [self]
-        elif(len(self.GetChildren()) == 0):
+        if(self.parent == None):
+            if(self.levels == None):
+                return [self] if depth == 0 else []
+            if(depth < len(self.levels)):
+                return list(self.levels[depth])
             return []
-        else:
-            nodes = []
-            for x in self.GetChildren():
-                nodes += x.GetDepthNodes(depth -1)
-            return nodes
+        nodes = [self]
+        for _ in range(depth):
+            nodes = [child for node in nodes for child in node.children]
+        return nodes
 
     def GetNeighburs(self):
         if(self.parent == None):
@@ -273,20 +827,268 @@ class TreeNode:
         return self
 
     def GetBottom(self):
-        leaves = self.GetLeaves()
-        return max(leaves, key = lambda x: x.depth)
+        return max(self.GetLeaves(), key = lambda x: x.depth)
     
+# move is the action that leads from the parent to this node, None for the top
 class MinimaxTreeNode(TreeNode):
-    def __init__(self, depth):
+    __slots__ = ('move', 'point')
+
+    def __init__(self, depth, move = None):
         super().__init__(depth)
-        self.actions = queue.Queue().queue
+        self.move = move
         self.point = None
 
+    # The actions from the ancestor (the top if not given) to this node, found by walking up the parents
+    def GetActions(self, ancestor = None):
+        actions = []
+        node = self
+        while(node != ancestor and node.parent != None):
+            actions.append(node.move)
+            node = node.parent
+        actions.reverse()
+        return tuple(actions)
+
+    @property
+    def actions(self):
+        return self.GetActions()
+
 class DeepimaxTreeNode(MinimaxTreeNode):
-    def __init__(self, depth):
-        super().__init__(depth)
+    __slots__ = ('nominies',)
+
+    def __init__(self, depth, move = None):
+        super().__init__(depth, move)
         self.nominies = []
 
+class TreeStore:
+    """
+    A search tree kept in parallel arrays instead of node objects, a node is an index in them and the top is 0.
+    The children of a node are added together, so they sit one after another and a node only needs its
+    first child and children count (the next sibling of a node is the next index).
+    Nodes of one depth are in the order they are in the tree, from left to right.
+    """
+    __slots__ = ('parents', 'depths', 'moves', 'points', 'firstChildren', 'childCounts', 'levels')
+    NODEBYTES = 27          # Bytes of one node in the arrays, its place in the level index included
+
+    def __init__(self):
+        self.parents = array('i', [-1])
+        self.depths = array('b', [0])
+        self.moves = array('h', [-1])           # start * ROOMS + end of the action that leads to the node, room indices
+        self.points = array('d', [math.nan])    # nan is a node without a point
+        self.firstChildren = array('i', [0])
+        self.childCounts = array('i', [0])
+        self.levels = [array('i', [0])]         # The nodes of each depth, from left to right
+
+    def __len__(self):
+        return len(self.parents)
+
+    # Adds the children of the node, one for each action, and returns their indices
+    def AddChildren(self, node, actions):
+        first = len(self.parents)
+        count = len(actions)
+        self.firstChildren[node] = first
+        self.childCounts[node] = count
+        self.parents.extend([node] * count)
+        self.depths.extend([self.depths[node] + 1] * count)
+        self.Level(self.depths[node] + 1).extend(range(first, first + count))
+        self.moves.extend([EncodeMove(action) for action in actions])
+        self.points.extend([math.nan] * count)
+        self.firstChildren.extend([0] * count)
+        self.childCounts.extend([0] * count)
+        return range(first, first + count)
+
+    # Adds the children of a whole depth at once, nodes[parentRows[i]] is the parent of the i-th child.
+    # The children of a node have to come one after another. Returns their indices.
+    def AddLevel(self, nodes, parentRows, moves):
+        first = len(self.parents)
+        count = len(parentRows)
+        parents = [nodes[row] for row in parentRows]
+        self.parents.extend(parents)
+        if(count != 0):
+            self.depths.extend([self.depths[parents[0]] + 1] * count)
+            self.Level(self.depths[parents[0]] + 1).extend(range(first, first + count))
+        self.moves.extend(moves)
+        self.points.extend([math.nan] * count)
+        self.firstChildren.extend([0] * count)
+        self.childCounts.extend([0] * count)
+        for i in range(count):
+            parent = parents[i]
+            if(self.childCounts[parent] == 0):
+                self.firstChildren[parent] = first + i
+            self.childCounts[parent] += 1
+        return range(first, first + count)
+
+    # The deepest depth of the tree
+    def Depth(self):
+        return len(self.levels) - 1
+
+    # The level index of the depth, made when the first node of the depth comes
+    def Level(self, depth):
+        while(len(self.levels) <= depth):
+            self.levels.append(array('i'))
+        return self.levels[depth]
+
+    def Children(self, node):
+        first = self.firstChildren[node]
+        return range(first, first + self.childCounts[node])
+
+    def Point(self, node):
+        point = self.points[node]
+        if(math.isnan(point)):
+            return None
+        if(point.is_integer()):
+            return int(point)
+        return point
+
+    def SetPoint(self, node, point):
+        if(point == None):
+            point = math.nan
+        self.points[node] = point
+
+    def Action(self, node):
+        return DecodeMove(self.moves[node])
+
+    # The actions from the top to the node, found by walking up the parents
+    def Actions(self, node):
+        actions = []
+        while(self.parents[node] != -1):
+            actions.append(DecodeMove(self.moves[node]))
+            node = self.parents[node]
+        actions.reverse()
+        return tuple(actions)
+
+    def DepthNodes(self, depth):
+        if(depth < len(self.levels)):
+            return self.levels[depth]
+        return array('i')
+
+    # The leaves of the whole tree, depth by depth
+    def Leaves(self):
+        childCounts = self.childCounts
+        for level in self.levels:
+            for node in level:
+                if(childCounts[node] == 0):
+                    yield node
+
+    # The first node of the deepest depth, all its nodes are leaves
+    def Bottom(self):
+        for level in reversed(self.levels):
+            if(len(level) != 0):
+                return level[0]
+
+    # A node object for the node, for code that walks trees made of TreeNodes
+    def Node(self, node):
+        return TreeStoreNode(self, node)
+
+# An action as one number, start * ROOMS + end with the room indices
+def EncodeMove(action):
+    return CELL_INDEX[action[0][0]][action[0][1]] * len(CELLS) + CELL_INDEX[action[1][0]][action[1][1]]
+
+def DecodeMove(move):
+    return (CELLS[move // len(CELLS)], CELLS[move % len(CELLS)])
+
+# Actions as a string of bytes, two for each EncodeMove number
+def EncodeActions(actions):
+    return array('H', [EncodeMove(action) for action in actions]).tobytes()
+
+def DecodeActions(encoded):
+    return tuple(DecodeMove(move) for move in array('H', encoded))
+
+class TreeStoreNode:
+    """
+    A view of one node of a TreeStore, it has the reading side of the MinimaxTreeNode API
+    so DrawTree and the game go through a stored tree the same way as through a tree of nodes.
+    """
+    __slots__ = ('store', 'index')
+
+    def __init__(self, store, index):
+        self.store = store
+        self.index = index
+
+    def __eq__(self, other):
+        return isinstance(other, TreeStoreNode) and self.store is other.store and self.index == other.index
+
+    def __hash__(self):
+        return hash((id(self.store), self.index))
+
+    @property
+    def depth(self):
+        return self.store.depths[self.index]
+
+    @property
+    def parent(self):
+        parent = self.store.parents[self.index]
+        if(parent == -1):
+            return None
+        return TreeStoreNode(self.store, parent)
+
+    @property
+    def children(self):
+        return [TreeStoreNode(self.store, i) for i in self.store.Children(self.index)]
+
+    @property
+    def point(self):
+        return self.store.Point(self.index)
+
+    @point.setter
+    def point(self, point):
+        self.store.SetPoint(self.index, point)
+
+    @property
+    def actions(self):
+        return self.store.Actions(self.index)
+
+    @property
+    def move(self):
+        if(self.store.parents[self.index] == -1):
+            return None
+        return self.store.Action(self.index)
+
+    def GetActions(self):
+        return self.store.Actions(self.index)
+
+    def GetParent(self):
+        return self.parent
+
+    def GetChildren(self):
+        return self.children
+
+    # The leaves under this node, from left to right
+    def GetLeaves(self):
+        store = self.store
+        nodes = [self.index]
+        while(len(nodes) != 0):
+            node = nodes.pop()
+            if(store.childCounts[node] == 0):
+                yield TreeStoreNode(store, node)
+            else:
+                nodes.extend(reversed(store.Children(node)))
+
+    def GetTop(self):
+        return TreeStoreNode(self.store, 0)
+
+    def GetDepthNodes(self, depth):
+        if(self.index == 0):
+            return [TreeStoreNode(self.store, i) for i in self.store.DepthNodes(depth)]
+        nodes = [self]
+        for _ in range(depth):
+            nodes = [child for node in nodes for child in node.children]
+        return nodes
+
+    def GetNeighburs(self):
+        if(self.store.parents[self.index] == -1):
+            return self
+        return self.parent.GetChildren()
+
+    def SameDepthNodes(self):
+        if(self.store.parents[self.index] != -1):
+            return self.GetTop().GetDepthNodes(self.depth)
+        return self
+
+    def GetBottom(self):
+        if(self.index == 0):
+            return TreeStoreNode(self.store, self.store.Bottom())
+        return max(self.GetLeaves(), key = lambda x: x.depth)
+
 class Controller():
     def __init__(self):
         self.title = None
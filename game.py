@@ -47,6 +47,11 @@ class Gameplay():
         if(self.time == None):
             self.time = 30
 
+        # The bots search deeper and deeper until the turn time is up
+        for controller in (foxController, sheepsController):
+            if(type(controller) == Bot.Agent):
+                controller.timeLimit = self.time
+
     def Go(self):
         """
         Indicates the start of the gameplay. If this function is executed,
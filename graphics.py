@@ -113,30 +113,23 @@ class Display():
         else:
             self.canvas.delete("all")
 
-        for row in range(len(board.rooms) -2):
-            for column in range(len(board.rooms[row +1]) -2):
-                neighbors = []
-                if(board.rooms[row +1][column +1] != 0):
-                    neighbors = board.Neighbors(row +1, column +1)
-
-                # Draw lines between rooms
-                for n in neighbors:
-                    targetRow = n[0] -1
-                    targetColumn = n[1] -1
-                    self.canvas.create_line((column * Display.TILEWIDTH) + Display.ROOMSIZE/2,
-                                (row * Display.TILEHEIGHT) + Display.ROOMSIZE/2,
-                                (targetColumn * Display.TILEWIDTH) + Display.ROOMSIZE/2,
-                                (targetRow * Display.TILEHEIGHT) + Display.ROOMSIZE/2,
-                                fill = Display.ROOMCOLOR,
-                                width = Display.ROUTWIDTH)
-
-                # Draw rooms
-                if(board.rooms[row +1][column +1] != 0):
-                    self.canvas.create_oval(column * Display.TILEWIDTH,
-                                row * Display.TILEHEIGHT,
-                                (column * Display.TILEWIDTH) + Display.ROOMSIZE,
-                                (row * Display.TILEHEIGHT) + Display.ROOMSIZE,
-                                fill = Display.ROOMCOLOR)     
+        for row, column in Entities.CELLS:
+            # Draw lines between rooms
+            for targetRow, targetColumn in Entities.ROOM_NEIGHBORS[row][column]:
+                self.canvas.create_line(((column -1) * Display.TILEWIDTH) + Display.ROOMSIZE/2,
+                            ((row -1) * Display.TILEHEIGHT) + Display.ROOMSIZE/2,
+                            ((targetColumn -1) * Display.TILEWIDTH) + Display.ROOMSIZE/2,
+                            ((targetRow -1) * Display.TILEHEIGHT) + Display.ROOMSIZE/2,
+                            fill = Display.ROOMCOLOR,
+                            width = Display.ROUTWIDTH)
+
+        # Draw rooms (after the lines, so they stay on top)
+        for row, column in Entities.CELLS:
+            self.canvas.create_oval((column -1) * Display.TILEWIDTH,
+                        (row -1) * Display.TILEHEIGHT,
+                        ((column -1) * Display.TILEWIDTH) + Display.ROOMSIZE,
+                        ((row -1) * Display.TILEHEIGHT) + Display.ROOMSIZE,
+                        fill = Display.ROOMCOLOR)
 
         # Draw Fox
         self.canvas.create_oval((board.fox[1] -1) * Display.TILEWIDTH,
@@ -475,6 +468,17 @@ class Display():
                 if(self.foxDepthEntry):
                     self.foxDepthEntry.destroy()
                     self.foxDepthEntry = None
+
+        if(event.widget.get() == Entities.Strategy.PVS.name):
+            if(not self.foxDepthEntry):
+                self.__DrawFoxDepthText()
+            else:
+                if(self.foxDepthLabel):
+                    self.foxDepthLabel.destroy()
+                    self.foxDepthLabel = None
+                if(self.foxDepthEntry):
+                    self.foxDepthEntry.destroy()
+                    self.foxDepthEntry = None
             
         if(event.widget.get() == Entities.Strategy.Expectimax.name):
             if(not self.foxDepthEntry):
@@ -534,6 +538,17 @@ class Display():
                     self.sheepsDepthEntry.destroy()
                     self.sheepsDepthEntry = None
 
+        if(event.widget.get() == Entities.Strategy.PVS.name):
+            if(not self.sheepsDepthEntry):
+                self.__DrawSheepsDepthText()
+            else:
+                if(self.sheepsDepthLabel):
+                    self.sheepsDepthLabel.destroy()
+                    self.sheepsDepthLabel = None
+                if(self.sheepsDepthEntry):
+                    self.sheepsDepthEntry.destroy()
+                    self.sheepsDepthEntry = None
+
         if(event.widget.get() == Entities.Strategy.Expectimax.name):
             if(not self.sheepsDepthEntry):
                 self.__DrawSheepsDepthText()
@@ -700,11 +715,11 @@ class Display():
 
     def AcceptMultipliers(self):
         try:
-            Entities.ACM = int(self.ACMEntry.get())
-            Entities.ADM = int(self.ADMEntry.get())
-            Entities.AMM = int(self.AMMEntry.get())
-            Entities.SCountM = int(self.SCMEntry.get())
-            Entities.SM = int(self.SMEntry.get())
+            Entities.SetMultipliers(sm = int(self.SMEntry.get()),
+                                    sCountM = int(self.SCMEntry.get()),
+                                    adm = int(self.ADMEntry.get()),
+                                    amm = int(self.AMMEntry.get()),
+                                    acm = int(self.ACMEntry.get()))
 
         except:
             pass
@@ -0,0 +1,315 @@
+"""
+parallel.py. Searches with the actions of the top split over worker processes, each worker searches some of
+them and the best one is taken. The workers search without a tree, each one keeps its own transposition table.
+In a Lazy SMP search the workers instead search the whole top with a transposition table they share with the main process.
+
+Written by Ali Zandian (alizandian@outlook.com) for University project, researching a better way to gauge unlimited trees.
+A project at the university of Ashrafi Esfahani.
+"""
+
+import entities as Entities
+import bot as Bot
+import multiprocessing as Multiprocessing
+import math
+import sys
+
+# Pools of worker processes by their number of workers, each with the point and the stop flag its workers share.
+# Starting processes is slow, so a pool is kept for the whole run.
+pools = {}
+
+# In a worker: the point and stop flag shared with the other workers, the table, ordering and Deepimax memo kept between
+# its searches and the shared table of the last Lazy SMP search
+sharedPoint = None
+sharedStop = None
+table = None
+ordering = None
+memo = None
+sharedTable = None
+
+def Context():
+    """
+    Workers are forked on Linux, they start at once with the modules already imported.
+    Elsewhere they start the way the platform does by default (spawned on Windows and macOS, where forking
+    a process with threads, as Tk and the gameplay thread are, is not safe). A spawned worker imports the main
+    module again, so it has to start the application only under "if __name__ == '__main__'" as FoxAndSheeps.py
+    and benchmark.py do.
+    """
+    if(sys.platform.startswith('linux')):
+        return Multiprocessing.get_context('fork')
+    return Multiprocessing.get_context()
+
+def GetPool(workers):
+    """ The pool with this many workers, the point and the stop flag they share, it is started the first time it is asked for """
+    if(workers not in pools):
+        context = Context()
+        # The workers share the tracker of shared memory blocks of this process, one of their own
+        # would remove the blocks of the Lazy SMP tables they use again when they end
+        from multiprocessing import resource_tracker as ResourceTracker
+        ResourceTracker.ensure_running()
+        point = context.RawValue('d', math.nan)
+        stop = context.RawValue('b', 0)
+        pool = context.Pool(workers, initializer = InitializeWorker, initargs = (point, stop))
+        pools[workers] = (pool, point, stop)
+    return pools[workers]
+
+def InitializeWorker(point, stop):
+    global sharedPoint
+    global sharedStop
+    sharedPoint = point
+    sharedStop = stop
+
+def Multipliers():
+    """ The multipliers of the evaluation function, the workers take them from the main process with each search """
+    return (Entities.SM, Entities.SCountM, Entities.ADM, Entities.AMM, Entities.ACM)
+
+def PrepareWorker(multipliers, deadline):
+    """ Takes the multipliers and the deadline of the search in the main process, in a worker """
+    global table
+    global ordering
+    global memo
+    if(multipliers != Multipliers()):
+        Entities.SetMultipliers(*multipliers)
+    Bot.searchDeadline = deadline
+    if(table == None or table.multipliersVersion != Entities.MultipliersVersion):
+        table = Entities.TranspositionTable()
+        ordering = Entities.MoveOrdering()
+        memo = Entities.DeepimaxMemo()
+
+def Board(snapshot, actions):
+    """ A board at the position of the snapshot after the actions """
+    board = Entities.Board()
+    board.Restore(snapshot)
+    Bot.ApplyActions(board, actions)
+    return board
+
+#region Minimax with alpha beta pruning
+def AlphaBetaRoot(board, actions, depth, isMax, workers, quiescence = 0):
+    """
+    MinimaxAlphaBetaLine of the board with the actions of the top split over the workers.
+    The first action is searched on its own, so the others start with its point as their bound.
+    Each better point found then tightens the bound of the searches that start after it.
+    Returns (point, line) like MinimaxAlphaBetaLine, ties go to any of the actions with the same point.
+
+    actions -> The actions of the top, in the order to search them.
+    """
+    if(len(actions) == 0):
+        return None
+    pool, shared, _ = GetPool(workers)
+    shared.value = math.nan
+    snapshot = board.Snapshot()
+    tasks = [(i, snapshot, actions[i], depth, isMax, quiescence, Multipliers(), Bot.searchDeadline) for i in range(len(actions))]
+    best = [None, None]
+
+    def Take(index, result, timedOut):
+        if(timedOut):
+            raise Bot.SearchTimeout()
+        # Cut by the bound, it is no better than the best one
+        if(result == None):
+            return
+        current, currentIndex = best
+        if(current == None or (isMax and result[0] > current[0]) or (not isMax and result[0] < current[0]) or
+            (result[0] == current[0] and index < currentIndex)):
+            best[0] = (result[0], (actions[index],) + result[1])
+            best[1] = index
+            shared.value = result[0]
+
+    Take(*pool.apply(SearchAlphaBeta, (tasks[0],)))
+    for index, result, timedOut in pool.imap_unordered(SearchAlphaBeta, tasks[1:]):
+        Take(index, result, timedOut)
+    return best[0]
+
+def SearchAlphaBeta(task):
+    """ In a worker, searches one action of the top with the bound shared by the workers. Returns (index, result, timedOut) """
+    index, snapshot, action, depth, isMax, quiescence, multipliers, deadline = task
+    PrepareWorker(multipliers, deadline)
+    board = Board(snapshot, (action,))
+
+    a = -math.inf
+    b = math.inf
+    point = sharedPoint.value
+    if(not math.isnan(point)):
+        if(isMax):
+            a = point
+        else:
+            b = point
+    try:
+        return index, Bot.MinimaxAlphaBetaLine(board, 1, depth, not isMax, a, b, table, ordering, quiescence), False
+    except Bot.SearchTimeout:
+        return index, None, True
+#endregion
+
+#region Expectimax
+def ExpectimaxRoot(board, actions, depth, isMax, workers, bounds = None):
+    """
+    ExpectimaxLine of the board with the actions of the top split over the workers.
+    Returns (point, line) like ExpectimaxLine, with the same ties to the first action.
+    The actions of the top are searched at once, so only the positions under them are cut with the bounds.
+    """
+    if(len(actions) == 0):
+        return None
+    pool, _, _ = GetPool(workers)
+    snapshot = board.Snapshot()
+    tasks = [(i, snapshot, actions[i], depth, isMax, bounds, Multipliers(), Bot.searchDeadline) for i in range(len(actions))]
+    best = None
+    # In the order of the actions, so the first one of the same points is kept
+    for index, result, timedOut in pool.imap(SearchExpectimax, tasks):
+        if(timedOut):
+            raise Bot.SearchTimeout()
+        if(best == None or result[0] > best[0]):
+            best = (result[0], (actions[index],) + result[1])
+    return best
+
+def SearchExpectimax(task):
+    """ In a worker, searches one action of the top. Returns (index, result, timedOut) """
+    index, snapshot, action, depth, isMax, bounds, multipliers, deadline = task
+    PrepareWorker(multipliers, deadline)
+    board = Board(snapshot, (action,))
+    try:
+        return index, Bot.ExpectimaxLine(board, 1, depth, not isMax, True, bounds = bounds), False
+    except Bot.SearchTimeout:
+        return index, None, True
+#endregion
+
+#region Deepimax
+# The re-engagements are made in this process a level at a time until there are this many for each worker,
+# their sizes differ a lot and more of them share the work out more evenly
+REENGAGEMENTSPERWORKER = 2
+
+class Reengagement:
+    """ A Deepimax call that re-engages a node, the top's or a nominee's, with the calls it makes on its own nominees """
+    def __init__(self, node, maxDepth, isMax, doa, roa):
+        self.node = node
+        self.maxDepth = maxDepth
+        self.isMax = isMax
+        self.doa = doa
+        self.roa = roa
+        self.calls = None       # The re-engagements of its nominees, when it was expanded in this process
+        self.result = None      # The node it chose
+        self.key = None         # Its key in the memo
+
+    # Makes the re-engagements of the node's nominees, which it has sorted
+    def Expand(self):
+        theMaxDepth, doa, roa = Bot.ReengageArguments(self.maxDepth, self.doa, self.roa)
+        nominees = self.node.nominies[:self.roa]
+        if(theMaxDepth == 0):
+            self.calls = []
+            self.result = Bot.DeepimaxChoose(self.node, nominees, self.isMax)
+        else:
+            self.calls = [Reengagement(nominee, theMaxDepth, not self.isMax, doa, roa) for nominee in nominees]
+
+    # The node it chose, from the ones its re-engagements chose. The ones chosen here are kept in the memo.
+    def Resolve(self, memo):
+        if(self.result == None):
+            self.result = Bot.DeepimaxChoose(self.node, [call.Resolve(memo) for call in self.calls], self.isMax)
+            if(memo != None and self.key != None):
+                memo.Keep(self.key, self.result.point, self.result.GetActions(self.node))
+        return self.result
+
+def DeepimaxReengage(board, top, maxDepth, isMax, doa, roa, workers, memo = None):
+    """
+    The re-engagements of the top of Deepimax, with its nominees sorted, over the workers.
+    The calls are made in this process one level of re-engagements at a time until there are enough of them,
+    then each of the last level's is searched by a worker, from the top's position and the actions down to its nominee.
+    Returns the node the top chose, as Deepimax does.
+
+    memo -> The DeepimaxMemo of this process, for the calls made here and the ones the workers made.
+    The workers each keep one of their own for the calls under them.
+    """
+    pool, _, _ = GetPool(workers)
+    root = Reengagement(top, maxDepth, isMax, doa, roa)
+    root.Expand()
+    calls = root.calls
+    while(len(calls) != 0):
+        expand = len(calls) < workers * REENGAGEMENTSPERWORKER
+        nextCalls = []
+        for call in calls:
+            path = call.node.GetActions(top)
+            captures = Bot.ApplyActions(board, path)
+            if(memo != None):
+                call.key = (board.zobristKey, call.maxDepth, call.doa, call.roa, call.isMax)
+                found = memo.Get(call.key)
+                if(found != None):
+                    call.result = Bot.DeepimaxChain(call.node, Entities.DecodeActions(found[1]), found[0])
+            if(call.result == None and expand):
+                node = Bot.Deepimax(board, call.node, 0, call.maxDepth, call.isMax, call.doa, call.roa, keepTree = False, reengage = False)
+                if(len(node.nominies) != 0):
+                    call.Expand()
+                    nextCalls += call.calls
+                else:
+                    # A leaf, there is nothing to re-engage under it
+                    call.result = node
+            Bot.ReverseActions(board, path, captures)
+        if(not expand):
+            break
+        calls = nextCalls
+
+    calls = [call for call in calls if call.result == None]
+    snapshot = board.Snapshot()
+    tasks = [(i, snapshot, Entities.EncodeActions(calls[i].node.GetActions(top)), calls[i].node.depth, calls[i].maxDepth, calls[i].isMax,
+                calls[i].doa, calls[i].roa, Multipliers(), Bot.searchDeadline) for i in range(len(calls))]
+    for index, point, actions, timedOut in pool.imap_unordered(SearchDeepimax, tasks):
+        if(timedOut):
+            raise Bot.SearchTimeout()
+        # The chosen node is made again under the nominee, with the actions that lead to it
+        calls[index].result = Bot.DeepimaxChain(calls[index].node, Entities.DecodeActions(actions), point)
+        if(memo != None):
+            memo.Keep(calls[index].key, point, Entities.DecodeActions(actions))
+    return root.Resolve(memo)
+
+def SearchDeepimax(task):
+    """ In a worker, makes one re-engagement. Returns (index, point, actions from the nominee to the chosen node, timedOut) """
+    index, snapshot, path, depth, maxDepth, isMax, doa, roa, multipliers, deadline = task
+    PrepareWorker(multipliers, deadline)
+    board = Board(snapshot, Entities.DecodeActions(path))
+    nominee = Entities.DeepimaxTreeNode(depth)
+    try:
+        result = Bot.Deepimax(board, nominee, 0, maxDepth, isMax, doa, roa, keepTree = False, memo = memo)
+    except Bot.SearchTimeout:
+        return index, None, None, True
+    return index, result.point, Entities.EncodeActions(result.GetActions(nominee)), False
+#endregion
+
+#region Lazy SMP
+def LazySearch(board, depth, isMax, workers, sharedTable, quiescence, search):
+    """
+    Runs the search in this process while workers - 1 helpers search the same top with the shared table.
+    The helpers only fill the table, the result is the one of the search. They are stopped when it is done.
+
+    sharedTable -> The SharedTranspositionTable the search uses.
+    search -> A function with no arguments that searches the board with sharedTable.
+    """
+    pool, _, stop = GetPool(workers - 1)
+    stop.value = 0
+    snapshot = board.Snapshot()
+    tasks = [(i, snapshot, depth, isMax, quiescence, sharedTable.name, Multipliers(), Bot.searchDeadline) for i in range(1, workers)]
+    helpers = pool.map_async(SearchLazy, tasks, chunksize = 1)
+    try:
+        return search()
+    finally:
+        stop.value = 1
+        helpers.wait()
+
+def SearchLazy(task):
+    """
+    In a worker, a helper of a Lazy SMP search. It searches the top one depth deeper at a time, to the depth of the
+    search or one past it for every other helper, with its own random start of the ordering, until it is stopped.
+    """
+    global sharedTable
+    index, snapshot, depth, isMax, quiescence, tableName, multipliers, deadline = task
+    PrepareWorker(multipliers, deadline)
+    if(sharedTable == None or sharedTable.name != tableName):
+        if(sharedTable != None):
+            sharedTable.Close()
+        sharedTable = Entities.SharedTranspositionTable(name = tableName)
+    helperOrdering = Entities.MoveOrdering(seed = index)
+    board = Board(snapshot, ())
+
+    Bot.searchStop = sharedStop
+    try:
+        for helperDepth in range(1, depth + index % 2 + 1):
+            Bot.MinimaxAlphaBetaLine(board, 0, helperDepth, isMax, -math.inf, math.inf, sharedTable, helperOrdering, quiescence)
+    except Bot.SearchTimeout:
+        pass
+    finally:
+        Bot.searchStop = None
+#endregion
@@ -10,13 +10,15 @@ import cProfile as Profiler
 import pstats
 import sys
 import os
+import entities as Entities
 
 RESULTPATH = 'results'
 
 
 class ProfilerData():
     def __init__(self, title, totalTime, totalCalls, algorithmCalls, algorithmTotalTime, algorithmRecursiveCalls, algorithmCumulativeTime,
-                 neighborsCount, copyCounts, queueCounts, evaluatedCount, evaluatedTime):
+                 neighborsCount, copyCounts, queueCounts, evaluatedCount, evaluatedTime,
+                 evaluationCacheHits = 0, evaluationCacheMisses = 0):
         self.Title = title
         self.TotalTime = totalTime
         self.TotalCalls = totalCalls
@@ -29,6 +31,13 @@ class ProfilerData():
         self.QueueCount = queueCounts
         self.EvaluatedCount = evaluatedCount
         self.EvaluatedTime = evaluatedTime
+        self.EvaluationCacheHits = evaluationCacheHits
+        self.EvaluationCacheMisses = evaluationCacheMisses
+
+    def EvaluationCacheHitRate(self):
+        if(self.EvaluationCacheHits + self.EvaluationCacheMisses == 0):
+            return 0
+        return self.EvaluationCacheHits / (self.EvaluationCacheHits + self.EvaluationCacheMisses)
 
 previousProfileData = None
 MyProfiler = Profiler.Profile()
@@ -115,8 +124,12 @@ def Print(onlyReturn, controllerTitle):
     stats.sort_stats('cumulative').print_stats()
     file.close()
 
+    # entities.py -> EvaluationCache, counted by the cache itself
+    evaluationCache = Entities.evaluationCache
+
     profilerData = ProfilerData(controllerTitle, totalTime, totalCalls, algorithmCalls, algorithmTotalTime, algorithmRecursiveCalls, 
-                                algorithmCumulativeTime, neighborsCount, copyCounts, queueCounts, evaluatedCounts, evaluatedTime)
+                                algorithmCumulativeTime, neighborsCount, copyCounts, queueCounts, evaluatedCounts, evaluatedTime,
+                                evaluationCache.hits, evaluationCache.misses)
 
     if(onlyReturn == False):
         PrintProfilerData(profilerData)
@@ -136,6 +149,9 @@ def PrintProfilerData(profilerData):
     print ("algorithm Recursive Calls: " + str(profilerData.AlgorithmRecursice))
     print ("Evaluated Counts: " + str(profilerData.EvaluatedCount))
     print ("Evaluated Time: " + str(profilerData.EvaluatedTime))
+    print ("Evaluation Cache Hits: " + str(profilerData.EvaluationCacheHits))
+    print ("Evaluation Cache Misses: " + str(profilerData.EvaluationCacheMisses))
+    print ("Evaluation Cache Hit Rate: " + str(round(profilerData.EvaluationCacheHitRate() * 100, 2)) + "%")
     print ("Get Neighbors Calls: " + str(profilerData.NeibursCount))
     print ("Entities Created: " + str(profilerData.CopyCount))
     print ("Queues Created: " + str(profilerData.QueueCount))
@@ -146,6 +162,7 @@ def DumpProfilerInfo():
     MyProfiler.clear()
     MyProfiler.disable()
     MyProfiler.enable()
+    Entities.evaluationCache.ResetCounters()
 
 def GetCallTime(value):
     return value[0]
@@ -0,0 +1,206 @@
+"""
+vectorized.py. NumPy versions of the board functions, working on many positions at once.
+A position is packed as a row of (foxIndex, sheepMask), the two first items of a Board.Snapshot.
+NumPy is optional, when it is missing 'Available' is False and the callers stay with the Board functions.
+
+Written by Ali Zandian (alizandian@outlook.com) for University project, researching a better way to gauge unlimited trees.
+A project at the university of Ashrafi Esfahani.
+"""
+
+import entities as Entities
+
+try:
+    import numpy as Numpy
+    Available = True
+except ImportError:
+    Numpy = None
+    Available = False
+
+# Under this many positions a batch costs more than evaluating them one by one
+BATCHMINIMUM = 64
+# Bytes ExpandPacked takes for the time being for each position it expands (sheeps to move, the most),
+# and bytes each child takes until it is in the tree, its packed position included
+EXPANDBYTES = 4400
+LEVELBYTES = 210
+# EvaluatePacked goes over this many rows at a time, the matrices of a bigger batch would take too much memory
+CHUNKROWS = 4096
+# Plies a depth first search leaves to MinimaxPacked, its memory grows with the branching to the power of this
+BATCHPLIES = 3
+
+if(Available):
+    ROOMS = len(Entities.CELLS)
+    ROOMBITS = Numpy.arange(ROOMS, dtype = Numpy.int64)
+    PLAYABLEMASK = (1 << ROOMS) - 1
+
+    # NEIGHBORS[i, j] -> 1 if rooms i and j are connected, float32 so the products go through BLAS (they stay exact)
+    NEIGHBORS = Numpy.zeros((ROOMS, ROOMS), dtype = Numpy.float32)
+    for i in range(ROOMS):
+        NEIGHBORS[i, list(Entities.NEIGHBORS[i])] = 1
+    DISTANCES = Numpy.array(Entities.DISTANCES, dtype = Numpy.float32)
+
+    # Per room index tables, padded with ROOMS, a bit which is never set in any mask
+    # NEIGHBORINDICES[i, k] -> the k-th neighbor of room i
+    # JUMPOVER[i, k], JUMPLANDING[i, k] -> the k-th capture of a fox on room i
+    NEIGHBORINDICES = Numpy.full((ROOMS, 8), ROOMS, dtype = Numpy.int64)
+    JUMPOVER = Numpy.full((ROOMS, 8), ROOMS, dtype = Numpy.int64)
+    JUMPLANDING = Numpy.full((ROOMS, 8), ROOMS, dtype = Numpy.int64)
+    for i in range(ROOMS):
+        for k, neighbor in enumerate(Entities.NEIGHBORS[i]):
+            NEIGHBORINDICES[i, k] = neighbor
+        for k, (over, landing) in enumerate(Entities.JUMPS[i]):
+            JUMPOVER[i, k] = over
+            JUMPLANDING[i, k] = landing
+
+def PackSnapshots(snapshots):
+    """ Packs the board snapshots into an (N, 2) array of (foxIndex, sheepMask) """
+    foxes = Numpy.fromiter((snapshot[0] for snapshot in snapshots), dtype = Numpy.int64, count = len(snapshots))
+    sheepMasks = Numpy.fromiter((snapshot[1] for snapshot in snapshots), dtype = Numpy.int64, count = len(snapshots))
+    return Numpy.stack((foxes, sheepMasks), axis = 1)
+
+def EmptyMasks(packed):
+    """ Masks of the empty rooms of the packed positions """
+    return PLAYABLEMASK & ~packed[:, 1] & ~(1 << packed[:, 0])
+
+def UnpackRooms(masks):
+    """ Returns the (N, ROOMS) 0/1 matrix of the masks """
+    return ((masks[:, None] >> ROOMBITS) & 1).astype(Numpy.float32)
+
+def EvaluatePacked(packed, sheepsMax):
+    """
+    Board.EvaluationFunction of every packed position, as an array of ints.
+    All five terms are found for the whole batch at once, with the same integer divisions, so
+    the points are exactly the ones the board gives.
+    """
+    if(len(packed) > CHUNKROWS):
+        return Numpy.concatenate([EvaluatePacked(packed[i:i + CHUNKROWS], sheepsMax) for i in range(0, len(packed), CHUNKROWS)])
+
+    foxIndices = packed[:, 0]
+    sheepMasks = packed[:, 1]
+    emptyMasks = EmptyMasks(packed)
+
+    # The terms summed over all sheeps
+    sheeps = UnpackRooms(sheepMasks)
+    empties = UnpackRooms(emptyMasks)
+    count = sheeps.sum(axis = 1).astype(Numpy.int64)
+    freedom = Numpy.einsum('ij,ij->i', sheeps, empties @ NEIGHBORS).astype(Numpy.int64)
+    distance = Numpy.einsum('ij,ij->i', sheeps, DISTANCES[foxIndices]).astype(Numpy.int64)
+
+    # The terms around the fox, straight from the masks
+    foxMoves = ((emptyMasks[:, None] >> NEIGHBORINDICES[foxIndices]) & 1).sum(axis = 1)
+    captures = ((sheepMasks[:, None] >> JUMPOVER[foxIndices]) & (emptyMasks[:, None] >> JUMPLANDING[foxIndices]) & 1).sum(axis = 1)
+
+    divisor = Numpy.maximum(count, 1)
+    points = ((sheepsMax // divisor) * Entities.SCountM + foxMoves * Entities.AMM + captures * Entities.ACM +
+                (freedom // divisor) * Entities.SM + (distance // divisor) * Entities.ADM)
+    return Numpy.where(count == 0, 0, points)
+
+def ExpandPacked(packed, isFox):
+    """
+    Generates the children of every packed position in one pass.
+    Returns (parents, starts, ends, children): the row of the parent of each child, the room indices of its action
+    and the packed child positions. Children come parent by parent, in the order AvailableActionsFox and
+    AvailableActionsSheep give their actions.
+    """
+    foxIndices = packed[:, 0]
+    sheepMasks = packed[:, 1]
+    emptyMasks = EmptyMasks(packed)
+
+    if(isFox):
+        # Per parent, the 8 move columns then the 8 capture columns
+        landings = Numpy.concatenate((NEIGHBORINDICES[foxIndices], JUMPLANDING[foxIndices]), axis = 1)
+        overs = Numpy.concatenate((Numpy.full((len(packed), 8), ROOMS, dtype = Numpy.int64), JUMPOVER[foxIndices]), axis = 1)
+        valid = ((emptyMasks[:, None] >> landings) & 1) == 1
+        valid[:, 8:] &= ((sheepMasks[:, None] >> overs[:, 8:]) & 1) == 1
+
+        parents, columns = Numpy.nonzero(valid)
+        starts = foxIndices[parents]
+        ends = landings[parents, columns]
+        childFoxes = ends
+        # A move clears the padding bit, which is never set
+        childMasks = sheepMasks[parents] & ~(1 << overs[parents, columns])
+    else:
+        # Per parent, 8 neighbor columns for each room, in room order
+        ends = Numpy.broadcast_to(NEIGHBORINDICES.reshape(-1), (len(packed), ROOMS * 8))
+        starts = Numpy.repeat(ROOMBITS, 8)
+        valid = (((sheepMasks[:, None] >> starts) & (emptyMasks[:, None] >> ends)) & 1) == 1
+
+        parents, columns = Numpy.nonzero(valid)
+        starts = starts[columns]
+        ends = ends[parents, columns]
+        childFoxes = foxIndices[parents]
+        childMasks = sheepMasks[parents] ^ (1 << starts) ^ (1 << ends)
+
+    children = Numpy.stack((childFoxes, childMasks), axis = 1)
+    return parents, starts, ends, children
+
+def EncodeMoves(starts, ends):
+    """ The actions of the room indices as Entities.EncodeMove numbers, in a list """
+    return (starts * ROOMS + ends).tolist()
+
+def ChildlessRows(parents, count):
+    """ Rows, out of count parents, that have no child in the parents of ExpandPacked """
+    return Numpy.nonzero(Numpy.bincount(parents, minlength = count) == 0)[0].tolist()
+
+def MinimaxPacked(board, isMax, plies, budget = None):
+    """
+    Full width minimax of the board position for the given plies, a whole ply is expanded and evaluated at once.
+    Returns (point, line) like Bot.MinimaxLine, with the same ties to the first action.
+    budget -> A list with the nodes it may still make, the children are taken from it. None is returned when
+    they are used up. None for no limit.
+    """
+    # Expanding down, each ply keeps its positions and the parents and actions of the next one
+    plyData = []
+    positions = PackSnapshots([board.Snapshot()])
+    isFox = isMax
+    for _ in range(plies):
+        parents, starts, ends, children = ExpandPacked(positions, isFox)
+        if(budget != None):
+            budget[0] -= len(children)
+            if(budget[0] < 0):
+                return None
+        plyData.append((positions, parents, starts, ends))
+        positions = children
+        isFox = not isFox
+
+    # Min and maxing up, positions without any action keep their own evaluation
+    points = [None] * plies + [EvaluatePacked(positions, board.sheepsMax)]
+    for ply in range(plies - 1, -1, -1):
+        positions, parents, starts, ends = plyData[ply]
+        counts = Numpy.bincount(parents, minlength = len(positions))
+        hasChildren = counts != 0
+        values = Numpy.empty(len(positions), dtype = Numpy.int64)
+        if(hasChildren.any()):
+            offsets = Numpy.concatenate(([0], Numpy.cumsum(counts)[:-1]))
+            reduce = Numpy.maximum.reduceat if isMax == (ply % 2 == 0) else Numpy.minimum.reduceat
+            values[hasChildren] = reduce(points[ply + 1], offsets[hasChildren])
+        if(not hasChildren.all()):
+            values[~hasChildren] = EvaluatePacked(positions[~hasChildren], board.sheepsMax)
+        points[ply] = values
+
+    # Going down the first child that gave each point
+    line = []
+    row = 0
+    for ply in range(plies):
+        positions, parents, starts, ends = plyData[ply]
+        children = Numpy.flatnonzero(parents == row)
+        if(len(children) == 0):
+            break
+        row = children[Numpy.flatnonzero(points[ply + 1][children] == points[ply][row])[0]]
+        line.append((Entities.CELLS[starts[row]], Entities.CELLS[ends[row]]))
+    return int(points[0][0]), tuple(line)
+
+def EvaluateSnapshots(board, snapshots):
+    """
+    Points of the positions of the snapshots, taken on the given board.
+    Big batches go through EvaluatePacked, small ones (or all of them without NumPy) through the evaluation cache.
+    """
+    if(Available and len(snapshots) >= BATCHMINIMUM):
+        return EvaluatePacked(PackSnapshots(snapshots), board.sheepsMax).tolist()
+
+    points = []
+    current = board.Snapshot()
+    for snapshot in snapshots:
+        board.Restore(snapshot)
+        points.append(Entities.evaluationCache.Evaluate(board))
+    board.Restore(current)
+    return points